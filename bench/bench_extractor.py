@@ -0,0 +1,126 @@
+"""本文抽出のベンチマーク。
+
+従来の方法（ページ全体の get_text → split_text_to_paragraph_blocks）と、
+extractor による本文抽出（→ text_to_blocks）を比べて、HTML 1MB あたりの処理速度と
+1ページあたりの本文の文字数・ブロック数・Notion APIリクエスト数（100ブロック・約450KBごと）を表示します。
+
+    python bench/bench_extractor.py               # 合成したページで測る
+    python bench/bench_extractor.py page1.html …  # 保存したHTMLで測る
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from extractor import extract_title_and_body, resolve_parser  # noqa: E402
+from notion_blocks import split_text_to_paragraph_blocks, text_to_blocks  # noqa: E402
+from notion_writer import iter_block_batches  # noqa: E402
+
+WORDS = ("notion pocket import article browser content reader cache network latency render "
+         "python async queue token limit block page request response parser document").split()
+
+
+def _sentence(rng) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+
+# ----- ナビ・Cookieバナー・サイドバー・フッターを含む、よくあるブログ記事風のページを作る -----
+def synthetic_page(rng, paragraphs: int) -> str:
+    nav = "".join(f'<li><a href="/c/{i}">{rng.choice(WORDS)}</a></li>' for i in range(40))
+    related = "".join(f'<li><a href="/p/{i}">{_sentence(rng)}</a></li>' for i in range(20))
+    body = []
+    for i in range(paragraphs):
+        if i % 6 == 0:
+            body.append(f"<h2>{_sentence(rng)}</h2>")
+        if i % 9 == 4:
+            body.append("<ul>" + "".join(f"<li>{_sentence(rng)}</li>" for _ in range(4)) + "</ul>")
+        if i % 11 == 7:
+            body.append("<pre><code>for row in rows:\n    print(row)\n</code></pre>")
+        body.append("<p>" + " ".join(_sentence(rng) for _ in range(rng.randint(2, 6))) + "</p>")
+    return f"""<!DOCTYPE html><html><head><title>{_sentence(rng)}</title>
+<style>body {{ font-family: sans-serif; }}</style><script>window.dataLayer = [];</script></head>
+<body><header class="site-header"><nav><ul>{nav}</ul></nav></header>
+<div class="cookie-consent">We use cookies to improve your experience. <a href="/privacy">Privacy</a></div>
+<div class="layout"><main><article class="post"><h1>{_sentence(rng)}</h1>{''.join(body)}</article>
+<section class="comments"><h3>Comments</h3><p>{_sentence(rng)}</p></section></main>
+<aside class="sidebar"><h3>Related</h3><ul>{related}</ul></aside></div>
+<footer class="site-footer"><ul>{nav}</ul><p>© 2024 Example</p></footer></body></html>"""
+
+
+PARSER = "html.parser"
+
+
+def baseline(html: str) -> tuple:
+    soup = BeautifulSoup(html, PARSER)
+    for tag in soup(["script", "style", "noscript", "template"]):
+        tag.decompose()
+    body = (soup.find("body") or soup).get_text(separator="\n", strip=True)
+    return body, list(split_text_to_paragraph_blocks(body))
+
+
+def extracted(html: str) -> tuple:
+    body = extract_title_and_body(html, parser=PARSER, max_body_chars=0)["body"]
+    return body, list(text_to_blocks(body))
+
+
+def measure(name: str, func, pages: list, repeat: int) -> dict:
+    total_bytes = sum(len(page.encode("utf-8")) for page in pages) * repeat
+    chars = blocks = requests = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            body, page_blocks = func(page)
+            chars += len(body)
+            blocks += len(page_blocks)
+            requests += max(1, sum(1 for _ in iter_block_batches(page_blocks)))
+    elapsed = time.perf_counter() - start
+    count = len(pages) * repeat
+    return {
+        "name": name,
+        "mb_per_sec": total_bytes / 1024 / 1024 / elapsed,
+        "chars_per_page": chars / count,
+        "blocks_per_page": blocks / count,
+        "requests_per_page": requests / count,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("html", nargs="*", help="計測に使うHTMLファイル（省略時は合成ページ）")
+    parser.add_argument("--pages", type=int, default=30, help="合成するページ数")
+    parser.add_argument("--repeat", type=int, default=3, help="繰り返し回数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--parser", default="html.parser", help="BeautifulSoup のパーサー（html.parser / lxml / html5lib）")
+    args = parser.parse_args(argv)
+    global PARSER
+    PARSER = resolve_parser(args.parser)
+
+    if args.html:
+        pages = []
+        for path in args.html:
+            with open(path, "rb") as f:
+                pages.append(f.read().decode("utf-8", errors="replace"))
+    else:
+        rng = random.Random(args.seed)
+        pages = [synthetic_page(rng, rng.randint(5, 60)) for _ in range(args.pages)]
+    size_mb = sum(len(page.encode("utf-8")) for page in pages) / 1024 / 1024
+    print(f"{len(pages)} pages, {size_mb:.2f} MB of HTML, parser={PARSER}, repeat={args.repeat}")
+
+    results = [measure("get_text (従来)", baseline, pages, args.repeat),
+               measure("extractor", extracted, pages, args.repeat)]
+    for r in results:
+        print(f"  {r['name']:<16} {r['mb_per_sec']:7.2f} MB/s  "
+              f"{r['chars_per_page']:9.0f} chars/page  {r['blocks_per_page']:6.1f} blocks/page  "
+              f"{r['requests_per_page']:5.2f} requests/page")
+    before, after = results
+    print(f"  本文の文字数: {after['chars_per_page'] / before['chars_per_page']:.0%}  "
+          f"ブロック数: {after['blocks_per_page'] / before['blocks_per_page']:.0%}  "
+          f"リクエスト数: {after['requests_per_page'] / before['requests_per_page']:.0%}（従来比）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""インポート処理全体のベンチマーク。
+
+ローカルの合成ウェブページ（bench/corpus.py）と Notion API のスタブ（bench/fake_notion.py）を起動し、
+生成した Pocket 形式の CSV を Importer（CLI / UI と同じ処理）で登録して、次の値を表示します。
+
+    rows/sec、1行の所要時間と段階ごとの p50/p95、ピークRSS、1行あたりの Notion API 呼び出し回数
+
+キャッシュ・ジャーナル・メトリクスのファイルは一時ディレクトリに作るので、作業ディレクトリは汚れません。
+--json に結果を書き出しておけば、変更前後の比較（回帰の確認）に使えます。
+
+    python bench/bench_import.py --rows 200
+    python bench/bench_import.py --rows 1000 --mix static=90,missing=10 --notion-rate 0 --json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from notion_client import Client  # noqa: E402
+from importer import Importer, ImportSettings, fetch_database_properties  # noqa: E402
+from metrics import setup_logging  # noqa: E402
+from extractor import DEFAULT_MAX_BODY_CHARS  # noqa: E402
+from pocket_csv import iter_pocket_rows, count_rows  # noqa: E402
+from corpus import CorpusServer, DEFAULT_MIX, parse_mix, write_pocket_csv  # noqa: E402
+from fake_notion import FakeNotion, DEFAULT_MAPPING  # noqa: E402
+
+
+def peak_rss_mb() -> dict:
+    if resource is None:
+        return {}
+    # Linux は KB、macOS はバイト単位。children は終了した子プロセス（ブラウザなど）の最大値
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit, 1),
+    }
+
+
+def run(args, workdir: str) -> dict:
+    csv_path = os.path.join(workdir, "pocket_bench.csv")
+
+    with CorpusServer(args.domains, slow_seconds=args.slow_seconds) as web, \
+         FakeNotion(rate=args.notion_rate, burst=args.notion_burst, latency=args.notion_latency) as fake:
+        kinds = write_pocket_csv(csv_path, web, args.rows, args.mix, args.seed)
+        notion = Client(auth="bench", base_url=fake.base_url)
+        properties = fetch_database_properties(notion, "bench-database")
+        settings = ImportSettings(
+            register_body=not args.no_body,
+            scrape_concurrency=args.concurrency,
+            upload_concurrency=args.upload_concurrency,
+            browser_pool_size=args.browsers,
+            per_domain_concurrency=args.per_domain_concurrency,
+            per_domain_rate=args.per_domain_rate,
+            use_cache=args.cache,
+            resume=False,
+            http_first=not args.browser_only,
+            extract_workers=args.extract_workers,
+            html_parser=args.html_parser,
+            max_body_chars=args.max_body_chars,
+        )
+        importer = Importer(notion, "bench-database", DEFAULT_MAPPING, properties, settings, job_id="bench",
+                            notify=lambda level, message: None)
+
+        started = time.perf_counter()
+        summary = asyncio.run(importer.run(iter_pocket_rows(csv_path), count_rows(csv_path)))
+        elapsed = time.perf_counter() - started
+
+        rows = summary["processed"] or 1
+        return {
+            "rows": args.rows,
+            "kinds": kinds,
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": round(summary["processed"] / elapsed, 2),
+            "success": summary["success"],
+            "failure": summary["failure"],
+            "skipped": summary["skipped"],
+            "tiers": summary["tiers"],
+            "stages": summary["stages"],
+            "peak_rss_mb": peak_rss_mb(),
+            "web_requests": web.requests,
+            "api_calls": dict(fake.calls),
+            "api_calls_per_row": round(fake.api_calls / rows, 3),
+            "blocks_per_page": round(sum(fake.blocks.values()) / max(1, len(fake.blocks)), 1),
+            "notion_retries": summary["notion_retries"],
+        }
+
+
+def print_report(result: dict) -> None:
+    print(f"rows: {result['rows']} {result['kinds']}")
+    print(f"  {result['seconds']}s, {result['rows_per_sec']} rows/sec "
+          f"(success {result['success']}, failure {result['failure']}, skipped {result['skipped']})")
+    print(f"  tiers: {result['tiers']}")
+    print(f"  peak RSS (MB): {result['peak_rss_mb']}")
+    print(f"  Notion API: {result['api_calls']} → {result['api_calls_per_row']} calls/row, "
+          f"{result['blocks_per_page']} blocks/page, {result['notion_retries']} retries")
+    print(f"  {'stage':<24}{'count':>7}{'p50 (s)':>10}{'p95 (s)':>10}{'total (s)':>11}")
+    for stage, values in result["stages"].items():
+        print(f"  {stage:<24}{values['count']:>7}{values['p50']:>10.3f}{values['p95']:>10.3f}{values['total']:>11.2f}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200, help="CSVの行数")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="ページの種類の割合（例: static=70,js=10,slow=10,missing=5,huge=5）")
+    parser.add_argument("--domains", type=int, default=20, help="合成ページを配信するドメイン（アドレス）の数")
+    parser.add_argument("--slow-seconds", type=float, default=1.5, help="slow ページの応答までの秒数")
+    parser.add_argument("--notion-rate", type=float, default=3.0, help="スタブが許す平均リクエスト数/秒（0で無制限）")
+    parser.add_argument("--notion-burst", type=int, default=10, help="スタブが許すバースト")
+    parser.add_argument("--notion-latency", type=float, default=0.05, help="スタブの1リクエストあたりの応答時間（秒）")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--upload-concurrency", type=int, default=6)
+    parser.add_argument("--browsers", type=int, default=1)
+    parser.add_argument("--per-domain-concurrency", type=int, default=2)
+    parser.add_argument("--per-domain-rate", type=float, default=1.0)
+    parser.add_argument("--browser-only", action="store_true")
+    parser.add_argument("--extract-workers", type=int, default=None, help="HTML解析のプロセス数（既定: コア数、0で別プロセスなし）")
+    parser.add_argument("--html-parser", default="auto")
+    parser.add_argument("--cache", action="store_true", help="スクレイピングキャッシュを使う（既定は使わない）")
+    parser.add_argument("--no-body", action="store_true")
+    parser.add_argument("--max-body-chars", type=int, default=DEFAULT_MAX_BODY_CHARS, help="本文の最大文字数（0で無制限）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--json", help="結果をJSONで書き出すファイル")
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_level)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="pocket2notion-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            result = run(args, workdir)
+        finally:
+            os.chdir(cwd)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""本文分割のマイクロベンチマーク。
+
+数MBのテキスト（英文・日本語・絵文字まじり・空白の無い文字列）を split_text_to_paragraph_blocks で
+段落ブロックに分け、処理速度と、上限（UTF-16 で2000単位）を超えたブロック・単語の途中で切れた箇所の数を、
+以前の「1900文字ごとに切る」方法と比べて表示します。
+
+    python bench/bench_splitter.py --mb 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from notion_blocks import MAX_RICH_TEXT_LEN, split_text_to_paragraph_blocks, utf16_len  # noqa: E402
+
+WORDS = "the quick brown fox jumps over lazy dog notion pocket import article reader".split()
+JA = "今日は記事の本文をノーションに登録するための処理を速くする方法について書きます"
+EMOJI = "😀🎉🚀👍🔥✨📚🍣"
+
+
+def english(rng, size: int) -> str:
+    parts, length = [], 0
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + ". "
+        if rng.random() < 0.15:
+            sentence += "\n\n"
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)
+
+
+def japanese(rng, size: int) -> str:
+    parts, length = [], 0
+    while length < size:
+        start = rng.randrange(len(JA) - 10)
+        sentence = JA[start:start + rng.randint(10, 30)] + rng.choice("、。。。！")
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)
+
+
+def emoji_mixed(rng, size: int) -> str:
+    return "".join(rng.choice(EMOJI) + " " if rng.random() < 0.3 else rng.choice(WORDS) + " "
+                   for _ in range(size // 4))
+
+
+def no_spaces(rng, size: int) -> str:
+    return "".join(rng.choice("abcdefghij字😀") for _ in range(size))
+
+
+# ----- 以前の実装：1900文字ごとに切るだけ（ログ出力は除いてある） -----
+def fixed_offset_blocks(text: str, chunk_len: int = 1900) -> list:
+    blocks = []
+    for pos in range(0, len(text), chunk_len):
+        chunk = text[pos:pos + chunk_len]
+        if chunk.strip():
+            blocks.append({"object": "block", "type": "paragraph",
+                           "paragraph": {"rich_text": [{"type": "text", "text": {"content": chunk}}]}})
+    return blocks
+
+
+def contents(blocks) -> list:
+    return [block["paragraph"]["rich_text"][0]["text"]["content"] for block in blocks]
+
+
+def mid_word_cuts(text: str, chunks: list) -> int:
+    # 前後の文字がどちらも英数字の位置で切れた箇所を数える
+    cuts, pos = 0, 0
+    for chunk in chunks[:-1]:
+        pos = text.find(chunk, pos) + len(chunk)
+        if pos < len(text) and text[pos - 1].isalnum() and text[pos].isalnum() and text[pos].isascii():
+            cuts += 1
+    return cuts
+
+
+def measure(name: str, func, text: str, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        blocks = list(func(text))
+        best = min(best, time.perf_counter() - start)
+    chunks = contents(blocks)
+    over = sum(1 for chunk in chunks if utf16_len(chunk) > MAX_RICH_TEXT_LEN)
+    size_mb = len(text.encode("utf-8")) / 1024 / 1024
+    print(f"    {name:<14} {size_mb / best:8.1f} MB/s  {len(blocks):6d} blocks  "
+          f"over limit: {over:5d}  mid-word cuts: {mid_word_cuts(text, chunks):5d}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=4, help="テキストごとのおおよその大きさ（百万文字）")
+    parser.add_argument("--repeat", type=int, default=3, help="繰り返し回数（最速の回を表示）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    size = int(args.mb * 1024 * 1024)
+    for name, generate in (("english", english), ("japanese", japanese),
+                           ("emoji mixed", emoji_mixed), ("no spaces", no_spaces)):
+        text = generate(rng, size)
+        print(f"{name}: {len(text):,} chars, {utf16_len(text):,} UTF-16 units")
+        measure("fixed 1900", fixed_offset_blocks, text, args.repeat)
+        measure("boundary-aware", split_text_to_paragraph_blocks, text, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""ベンチマーク用の合成ウェブページを配信するローカルサーバーと、Pocket 形式の CSV の生成。
+
+ページの種類（URL の先頭のパス）:
+    /static/<n>   静的な記事ページ（ナビゲーション・フッターつき）
+    /js/<n>       本文を JavaScript で後から描画するページ（HTTP では取れず、ブラウザに切り替わる）
+    /slow/<n>     応答が遅い静的ページ
+    /missing/<n>  404
+    /huge/<n>     数MBの巨大なページ
+
+ドメインごとの制御も測れるように、127.0.0.1〜127.0.0.N の複数のアドレスで同じ内容を配信する
+（Linux ではループバックの 127.0.0.0/8 はすべて使える。使えない環境では 127.0.0.1 だけになる）。
+
+    python bench/corpus.py --rows 500 --out pocket_bench.csv   # サーバーを起動したまま CSV を書き出す
+"""
+import argparse
+import csv
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KINDS = ("static", "js", "slow", "missing", "huge")
+DEFAULT_MIX = {"static": 70, "js": 10, "slow": 10, "missing": 5, "huge": 5}
+WORDS = ("notion pocket import article browser content reader cache network latency render python "
+         "async queue token limit block page request response parser document 記事 本文 登録").split()
+TAGS = ("python", "web", "design", "news", "long-read", "tools", "japan")
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in KINDS or not weight.strip():
+            raise ValueError(f"--mix は {'/'.join(KINDS)}=<重み> をカンマ区切りで指定してください: {part}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def _sentence(rng) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+
+def _article(rng, paragraphs: int) -> str:
+    parts = []
+    for i in range(paragraphs):
+        if i % 5 == 0:
+            parts.append(f"<h2>{_sentence(rng)}</h2>")
+        if i % 8 == 3:
+            parts.append("<ul>" + "".join(f"<li>{_sentence(rng)}</li>" for _ in range(3)) + "</ul>")
+        parts.append("<p>" + " ".join(_sentence(rng) for _ in range(rng.randint(2, 6))) + "</p>")
+    return "".join(parts)
+
+
+def _page(title: str, main: str, head: str = "") -> str:
+    nav = "".join(f'<li><a href="/c/{i}">Category {i}</a></li>' for i in range(30))
+    return f"""<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>{head}</head>
+<body><header class="site-header"><nav><ul>{nav}</ul></nav></header>
+<div class="cookie-banner">We use cookies. <button>OK</button></div>
+<main>{main}</main>
+<aside class="sidebar"><ul>{nav}</ul></aside><footer class="site-footer">© 2024 Bench</footer></body></html>"""
+
+
+# ----- 種類と番号からページを作る（同じ番号なら毎回同じ内容） -----
+def render(kind: str, number: int) -> str:
+    rng = random.Random(f"{kind}:{number}")
+    title = f"{kind.capitalize()} article {number}"
+    if kind == "js":
+        paragraphs = [" ".join(_sentence(rng) for _ in range(4)) for _ in range(rng.randint(8, 30))]
+        script = (
+            "<script>setTimeout(function () {"
+            "var root = document.getElementById('root');"
+            f"var ps = {paragraphs!r};"
+            "root.innerHTML = '<article><h1>" + title + "</h1>' + ps.map(function (p) { return '<p>' + p + '</p>'; }).join('') + '</article>';"
+            "}, 300);</script>"
+        )
+        return _page(title, '<div id="root"></div>', head=script)
+    if kind == "huge":
+        return _page(title, f"<article><h1>{title}</h1>{_article(rng, 6000)}</article>")
+    return _page(title, f"<article><h1>{title}</h1>{_article(rng, rng.randint(5, 60))}</article>")
+
+
+class _CorpusHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    slow_seconds = 1.5
+
+    def do_GET(self):
+        self.server.requests += 1
+        kind, _, number = self.path.strip("/").partition("/")
+        if kind not in KINDS or not number.isdigit() or kind == "missing":
+            self._send(404, b"<html><body><h1>Not Found</h1></body></html>")
+            return
+        if kind == "slow":
+            time.sleep(self.slow_seconds)
+        self._send(200, render(kind, int(number)).encode("utf-8"))
+
+    def _send(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# ----- 合成ページを配信するサーバー（domains 個のアドレスで同じ内容を配信する） -----
+class CorpusServer:
+    def __init__(self, domains: int = 20, slow_seconds: float = 1.5):
+        self.domains = max(1, domains)
+        self.slow_seconds = slow_seconds
+        self.servers = []
+
+    def start(self):
+        handler = type("CorpusHandler", (_CorpusHandler,), {"slow_seconds": self.slow_seconds})
+        for n in range(1, self.domains + 1):
+            try:
+                server = ThreadingHTTPServer((f"127.0.0.{n}", 0), handler)
+            except OSError:
+                if not self.servers:
+                    raise
+                break  # 127.0.0.2 以降が使えない環境
+            server.daemon_threads = True
+            server.requests = 0
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers.append(server)
+        return self
+
+    def close(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.servers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def requests(self) -> int:
+        return sum(server.requests for server in self.servers)
+
+    def url(self, kind: str, number: int) -> str:
+        host, port = self.servers[number % len(self.servers)].server_address[:2]
+        return f"http://{host}:{port}/{kind}/{number}"
+
+
+# ----- Pocket のエクスポートと同じ列の CSV を書き出す -----
+def write_pocket_csv(path: str, server: CorpusServer, rows: int, mix: dict = None, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    counts = dict.fromkeys(kinds, 0)
+    added = int(time.time()) - rows * 3600
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "url", "time_added", "tags", "status"])
+        for number in range(1, rows + 1):
+            kind = rng.choices(kinds, weights)[0]
+            counts[kind] += 1
+            tags = ",".join(rng.sample(TAGS, rng.randint(0, 3)))
+            writer.writerow([f"{kind} article {number}", server.url(kind, number), added + number * 3600,
+                             tags, rng.choice(["unread", "archive"])])
+    return counts
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200, help="CSVの行数")
+    parser.add_argument("--out", default="pocket_bench.csv", help="書き出すCSVファイル")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="ページの種類の割合（例: static=70,js=10,slow=10,missing=5,huge=5）")
+    parser.add_argument("--domains", type=int, default=20, help="配信に使うアドレス（ドメイン）の数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with CorpusServer(args.domains) as server:
+        counts = write_pocket_csv(args.out, server, args.rows, args.mix, args.seed)
+        print(f"Wrote {args.out}: {counts}. Serving on {len(server.servers)} addresses; Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
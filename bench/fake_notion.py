@@ -0,0 +1,240 @@
+"""ベンチマーク用の Notion API の代わりになるローカルサーバー。
+
+notion_client.Client(auth=..., base_url=FakeNotion.base_url) で接続できる。次のエンドポイントだけを実装する:
+    GET   /v1/databases/<id>         databases.retrieve（プロパティ定義を返す）
+    POST  /v1/databases/<id>/query   databases.query（作成済みのページを作成順に返す。フィルターは無視する）
+    POST  /v1/pages                  pages.create
+    PATCH /v1/pages/<id>             pages.update（archived: true のページは databases.query で返さなくなる）
+    PATCH /v1/blocks/<id>/children   blocks.children.append
+
+本物と同じく、トークンバケットで平均 rate 回/秒（最大 burst 回まで）を超えたリクエストには
+429（rate_limited, Retry-After つき）を返す。children が100件を超える場合や、テキストが
+2000（UTF-16 のコード単位）を超える場合、リクエストが 500KB を超える場合は 400（validation_error）を返す。
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DATABASE_PROPERTIES = {
+    "Name": {"id": "title", "name": "Name", "type": "title", "title": {}},
+    "URL": {"id": "url", "name": "URL", "type": "url", "url": {}},
+    "Added": {"id": "added", "name": "Added", "type": "date", "date": {}},
+    "Tags": {"id": "tags", "name": "Tags", "type": "multi_select", "multi_select": {"options": []}},
+    "Status": {"id": "status", "name": "Status", "type": "select", "select": {"options": []}},
+}
+DEFAULT_MAPPING = {"title": "Name", "url": "URL", "time_added": "Added", "tags": "Tags", "status": "Status"}
+MAX_CHILDREN = 100
+MAX_TEXT_LENGTH = 2000
+MAX_BODY_BYTES = 500 * 1000
+
+APPEND_PATH_RE = re.compile(r"^/v1/blocks/([^/]+)/children$")
+DATABASE_PATH_RE = re.compile(r"^/v1/databases/([^/]+)$")
+QUERY_PATH_RE = re.compile(r"^/v1/databases/([^/]+)/query$")
+PAGE_PATH_RE = re.compile(r"^/v1/pages/([^/]+)$")
+
+
+class _RateLimiter:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+def _text_errors(blocks: list) -> list:
+    errors = []
+    for i, block in enumerate(blocks):
+        content = block.get(block.get("type"), {}) if isinstance(block, dict) else {}
+        for item in content.get("rich_text", []):
+            text = item.get("text", {}).get("content", "")
+            if len(text.encode("utf-16-le")) // 2 > MAX_TEXT_LENGTH:
+                errors.append(f"body.children[{i}].{block['type']}.rich_text[0].text.content.length should be ≤ `{MAX_TEXT_LENGTH}`")
+    return errors
+
+
+class _NotionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def _handle(self, method: str):
+        stub = self.server.stub
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        if length > MAX_BODY_BYTES:
+            stub.count("validation_error")
+            self._send(400, {"object": "error", "status": 400, "code": "validation_error",
+                             "message": f"Request body too large: {length} bytes, limit is {MAX_BODY_BYTES}."})
+            return
+        path = self.path.split("?", 1)[0]
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if not stub.limiter.take():
+            stub.count("rate_limited")
+            self._send(429, {"object": "error", "status": 429, "code": "rate_limited",
+                             "message": "You have been rate limited. Please try again in a few minutes."},
+                       {"Retry-After": str(stub.retry_after)})
+            return
+
+        if method == "GET" and DATABASE_PATH_RE.match(path):
+            stub.count("databases.retrieve")
+            database_id = DATABASE_PATH_RE.match(path).group(1)
+            self._send(200, {"object": "database", "id": database_id, "properties": DATABASE_PROPERTIES})
+        elif method == "POST" and QUERY_PATH_RE.match(path):
+            stub.count("databases.query")
+            start = int(payload.get("start_cursor") or 0)
+            size = min(int(payload.get("page_size") or 100), 100)
+            pages = stub.pages[start:start + size]
+            has_more = start + size < len(stub.pages)
+            self._send(200, {"object": "list", "results": pages, "has_more": has_more,
+                             "next_cursor": str(start + size) if has_more else None})
+        elif method == "POST" and path == "/v1/pages":
+            stub.count("pages.create")
+            children = payload.get("children") or []
+            error = self._validate(children)
+            if error:
+                return
+            page = stub.add_page(payload.get("properties", {}))
+            stub.add_blocks(page["id"], len(children))
+            self._send(200, page)
+        elif method == "PATCH" and PAGE_PATH_RE.match(path):
+            stub.count("pages.update")
+            page = stub.update_page(PAGE_PATH_RE.match(path).group(1), payload)
+            if page is None:
+                self._send(404, {"object": "error", "status": 404, "code": "object_not_found", "message": path})
+            else:
+                self._send(200, page)
+        elif method == "PATCH" and APPEND_PATH_RE.match(path):
+            stub.count("blocks.children.append")
+            page_id = APPEND_PATH_RE.match(path).group(1)
+            children = payload.get("children") or []
+            error = self._validate(children)
+            if error:
+                return
+            stub.add_blocks(page_id, len(children))
+            self._send(200, {"object": "list", "results": [{"object": "block", "id": str(uuid.uuid4())} for _ in children]})
+        else:
+            stub.count("not_found")
+            self._send(404, {"object": "error", "status": 404, "code": "object_not_found", "message": f"{method} {path}"})
+
+    def _validate(self, children: list) -> bool:
+        errors = []
+        if len(children) > MAX_CHILDREN:
+            errors.append(f"body.children.length should be ≤ `{MAX_CHILDREN}`, instead was `{len(children)}`.")
+        errors.extend(_text_errors(children))
+        if errors:
+            self.server.stub.count("validation_error")
+            self._send(400, {"object": "error", "status": 400, "code": "validation_error", "message": " ".join(errors)})
+            return True
+        return False
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# ----- ローカルの Notion API スタブ（呼び出し回数・ページごとのブロック数を記録する） -----
+class FakeNotion:
+    def __init__(self, rate: float = 3.0, burst: int = 10, latency: float = 0.05, retry_after: int = 1):
+        self.limiter = _RateLimiter(rate, burst)
+        self.latency = latency
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self.blocks = Counter()  # ページID → ブロック数
+        self.pages = []          # 作成したページ（databases.query で返す）
+        self._lock = threading.Lock()
+        self._server = None
+
+    def count(self, name: str):
+        with self._lock:
+            self.calls[name] += 1
+
+    # ----- ページを記録する（title / rich_text には本物の応答と同じく plain_text を付ける） -----
+    def add_page(self, properties: dict) -> dict:
+        stored = {}
+        for name, value in properties.items():
+            prop_type = DATABASE_PROPERTIES.get(name, {}).get("type")
+            if prop_type in ("title", "rich_text"):
+                value = {prop_type: [dict(item, plain_text=item.get("text", {}).get("content", ""))
+                                     for item in value.get(prop_type, [])]}
+            stored[name] = {"id": DATABASE_PROPERTIES.get(name, {}).get("id", name), "type": prop_type, **value}
+        page = {"object": "page", "id": str(uuid.uuid4()), "properties": stored}
+        with self._lock:
+            self.pages.append(page)
+        return page
+
+    def update_page(self, page_id: str, payload: dict):
+        with self._lock:
+            for i, page in enumerate(self.pages):
+                if page["id"] == page_id:
+                    if payload.get("archived"):
+                        del self.pages[i]
+                        page = dict(page, archived=True)
+                    return page
+        return None
+
+    def add_blocks(self, page_id: str, count: int):
+        with self._lock:
+            self.blocks[page_id] += count
+
+    @property
+    def api_calls(self) -> int:
+        return sum(count for name, count in self.calls.items() if name != "not_found")
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _NotionHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from notion_client import Client
+from importer import Importer, ImportSettings, fetch_database_properties, CSV_COLUMNS
+from journal import make_job_id
+from pocket_csv import iter_pocket_rows, count_rows
+from metrics import setup_logging, DEFAULT_METRICS_PATH
+from extractor import DEFAULT_MAX_BODY_CHARS
+
+
+def parse_mapping(values) -> dict:
+    mapping = {}
+    for value in values or []:
+        column, sep, prop = value.partition("=")
+        column = column.strip()
+        if not sep or column not in CSV_COLUMNS or not prop.strip():
+            raise argparse.ArgumentTypeError(f"--map は <{'|'.join(CSV_COLUMNS)}>=<Notionプロパティ名> の形式で指定してください: {value}")
+        mapping[column] = prop.strip()
+    return mapping
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Pocket からエクスポートした CSV を Streamlit なしで Notion データベースに登録します。"
+                    "進捗は1行1件のJSONとして標準出力に、詳細ログは標準エラー出力に書き出します。",
+    )
+    parser.add_argument("csv", help="Pocket からエクスポートした CSV ファイル")
+    parser.add_argument("--token", default=os.environ.get("NOTION_TOKEN"), help="Notion API キー（既定: 環境変数 NOTION_TOKEN）")
+    parser.add_argument("--database-id", default=os.environ.get("NOTION_DATABASE_ID"), help="Notion データベース ID（既定: 環境変数 NOTION_DATABASE_ID）")
+    parser.add_argument("--map", action="append", metavar="COLUMN=PROPERTY",
+                        help="CSVカラムとNotionプロパティの対応（例: --map title=Name --map url=URL）。複数指定可")
+    parser.add_argument("--no-body", action="store_true", help="本文を Notion に登録しない")
+    parser.add_argument("--max-body-chars", type=int, default=DEFAULT_MAX_BODY_CHARS,
+                        help="本文の最大文字数。超えた分は省略し、その旨を末尾に書く（0で無制限、1000未満は1000）")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時にスクレイピングするURL数")
+    parser.add_argument("--upload-concurrency", type=int, default=6, help="同時に送信する Notion への登録数")
+    parser.add_argument("--browsers", type=int, default=1, help="同時に起動するブラウザ数")
+    parser.add_argument("--max-pages-per-browser", type=int, default=200, help="ブラウザを再起動するまでのページ数")
+    parser.add_argument("--per-domain-concurrency", type=int, default=2, help="同じドメインへの同時アクセス数")
+    parser.add_argument("--per-domain-rate", type=float, default=1.0, help="同じドメインへのアクセス頻度（回/秒）")
+    parser.add_argument("--browser-only", action="store_true", help="HTTPでの取得を試さず、すべてのURLをブラウザで取得する")
+    parser.add_argument("--extract-workers", type=int, default=None,
+                        help="HTML解析に使うプロセス数（既定: 使えるコア数、0で別プロセスを使わない）")
+    parser.add_argument("--html-parser", default="auto", choices=["auto", "lxml", "html.parser", "html5lib"],
+                        help="BeautifulSoup のパーサー（auto は lxml があれば lxml）")
+    parser.add_argument("--load-all-resources", action="store_true", help="ブラウザで画像・フォント・動画・広告/解析のリクエストも読み込む")
+    parser.add_argument("--no-cache", action="store_true", help="スクレイピング結果のキャッシュを使わない")
+    parser.add_argument("--cache-ttl-days", type=float, default=7, help="キャッシュの有効期間（日）")
+    parser.add_argument("--cache-max-mb", type=int, default=512, help="キャッシュの最大サイズ（MB）")
+    parser.add_argument("--no-resume", action="store_true", help="前回の記録を消して最初から登録する")
+    parser.add_argument("--no-dedupe", action="store_true", help="登録済みのURLやCSV内で重複したURLの行もスキップせずに登録する")
+    parser.add_argument("--progress-interval", type=float, default=1.0, help="進捗を出力する間隔（秒）")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="標準エラー出力に書き出すログのレベル")
+    parser.add_argument("--metrics-file", default=DEFAULT_METRICS_PATH,
+                        help="行ごとの処理時間を書き出すJSONLファイル（空文字で書き出さない）")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.token or not args.database_id:
+        parser.error("--token と --database-id（または環境変数 NOTION_TOKEN / NOTION_DATABASE_ID）を指定してください")
+    try:
+        mapping = parse_mapping(args.map)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    if not mapping:
+        parser.error("--map で少なくとも1つの対応を指定してください")
+
+    # 標準出力はJSONの進捗専用にし、ログは標準エラー出力へ回す
+    out = sys.stdout
+    setup_logging(args.log_level, stream=sys.stderr)
+
+    def emit(event: str, **fields):
+        out.write(json.dumps({"event": event, "time": round(time.time(), 3), **fields}, ensure_ascii=False) + "\n")
+        out.flush()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        notion = Client(auth=args.token)
+        try:
+            properties = fetch_database_properties(notion, args.database_id)
+        except Exception as e:
+            emit("error", message=f"データベース取得エラー: {e}")
+            return 2
+        unknown = [prop for prop in mapping.values() if prop not in properties]
+        if unknown:
+            emit("error", message=f"データベースに存在しないプロパティです: {', '.join(unknown)}")
+            return 2
+
+        settings = ImportSettings(
+            register_body=not args.no_body,
+            scrape_concurrency=args.concurrency,
+            upload_concurrency=args.upload_concurrency,
+            browser_pool_size=args.browsers,
+            max_pages_per_browser=args.max_pages_per_browser,
+            per_domain_concurrency=args.per_domain_concurrency,
+            per_domain_rate=args.per_domain_rate,
+            use_cache=not args.no_cache,
+            cache_ttl_seconds=args.cache_ttl_days * 24 * 3600,
+            cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+            resume=not args.no_resume,
+            dedupe=not args.no_dedupe,
+            extract_workers=args.extract_workers,
+            html_parser=args.html_parser,
+            max_body_chars=args.max_body_chars,
+            http_first=not args.browser_only,
+            block_resources=not args.load_all_resources,
+            metrics_path=args.metrics_file or None,
+        )
+        job_id = make_job_id(args.database_id, args.csv)
+        total = count_rows(args.csv)
+        rows = iter_pocket_rows(args.csv)
+
+        last_progress = [0.0]
+
+        def on_progress(stats, writer):
+            now = time.monotonic()
+            if now - last_progress[0] < args.progress_interval and stats.processed < stats.total:
+                return
+            last_progress[0] = now
+            emit("progress", processed=stats.processed, total=stats.total, success=stats.success,
+                 failure=stats.failure, skipped=stats.skipped,
+                 notion_rate=round(writer.current_rate, 2), notion_queue=writer.queue_depth)
+
+        importer = Importer(notion, args.database_id, mapping, properties, settings, job_id=job_id,
+                            notify=lambda level, message: emit(level, message=message))
+        emit("start", csv=args.csv, rows=total, job_id=job_id)
+        summary = asyncio.run(importer.run(rows, total, on_progress=on_progress))
+        emit("summary", **summary)
+    return 0 if summary["failure"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
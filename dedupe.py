@@ -0,0 +1,82 @@
+from collections import Counter
+from urls import normalize_url
+from metrics import get_logger
+
+logger = get_logger("dedupe")
+
+DUPLICATE_IN_DATABASE = "database"  # 登録先のデータベースに同じURLのページがある
+DUPLICATE_IN_CSV = "csv"            # CSVの前の行に同じURLがある
+DUPLICATE_STATUS = "Duplicate"      # 重複でスキップした行のスクレイピング結果として記録する値
+
+# URLを読み取れるプロパティの種類と、空でないページだけを取り出すフィルター
+URL_PROPERTY_FILTERS = {
+    "url": {"url": {"is_not_empty": True}},
+    "rich_text": {"rich_text": {"is_not_empty": True}},
+    "title": {"title": {"is_not_empty": True}},
+}
+
+
+# ----- 重複判定に使うキー（http/https やトラッキング用パラメータの違いを無視する） -----
+def url_key(url) -> str:
+    if not isinstance(url, str) or not url.strip().startswith(("http://", "https://")):
+        return ""
+    return normalize_url(url)
+
+
+def _property_url(prop: dict):
+    prop_type = prop.get("type")
+    if prop_type == "url":
+        return prop.get("url")
+    if prop_type in ("rich_text", "title"):
+        return "".join(item.get("plain_text", "") for item in prop.get(prop_type) or [])
+    return None
+
+
+# ----- データベースの既存ページから、URLプロパティの値（正規化済み）の集合を作る -----
+# writer.iter_database_pages で databases.query を100件ずつページングし、URLプロパティだけを受け取る。
+async def fetch_existing_urls(writer, property_name: str, property_info: dict) -> set:
+    prop_type = property_info.get("type")
+    if prop_type not in URL_PROPERTY_FILTERS:
+        raise ValueError(f"「{property_name}」（{prop_type} 型）からはURLを読み取れません")
+    query = {"filter": {"property": property_name, **URL_PROPERTY_FILTERS[prop_type]}}
+    if property_info.get("id"):
+        query["filter_properties"] = [property_info["id"]]
+
+    existing = set()
+    pages = 0
+    async for page in writer.iter_database_pages(**query):
+        pages += 1
+        key = url_key(_property_url(page.get("properties", {}).get(property_name, {})))
+        if key:
+            existing.add(key)
+    logger.info("Loaded %d existing URLs from %d database pages", len(existing), pages)
+    return existing
+
+
+# ----- CSVの行をデータベースの既存ページと、それまでのCSVの行に対して重複判定する -----
+# check() は行の順に呼ぶこと（最初に現れた行だけが登録対象になる）。
+class DuplicateIndex:
+    def __init__(self, existing=None):
+        self.existing = set(existing or ())
+        self.seen = set()
+        self.counts = Counter()
+
+    def check(self, url):
+        key = url_key(url)
+        if not key:
+            return None  # URLの無い行は重複判定しない
+        if key in self.existing:
+            reason = DUPLICATE_IN_DATABASE
+        elif key in self.seen:
+            reason = DUPLICATE_IN_CSV
+        else:
+            self.seen.add(key)
+            return None
+        self.counts[reason] += 1
+        return reason
+
+    # ----- 重複判定せずに、この行のURLを「CSVで既に現れた」ものとして覚える -----
+    def remember(self, url):
+        key = url_key(url)
+        if key:
+            self.seen.add(key)
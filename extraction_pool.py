@@ -0,0 +1,63 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from extractor import extract_title_and_body, resolve_parser, DEFAULT_MAX_BODY_CHARS
+from metrics import get_logger
+
+logger = get_logger("extraction_pool")
+
+
+# ----- このプロセスが使えるCPUコア数 -----
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        return os.cpu_count() or 1
+
+
+# ----- HTMLの解析と本文抽出を別プロセスで行うプール -----
+# BeautifulSoup による解析はCPUを使う純Pythonの処理なので、スクレイピングのイベントループ内で行うと
+# 巨大なページの解析中は他のすべての取得が止まる。生のHTMLを別プロセスに渡し、タイトルと本文だけを受け取る。
+# workers は既定で使えるコア数。0 の場合は別プロセスを使わず、スレッドで解析する。
+class ExtractionPool:
+    def __init__(self, workers: int = None, parser: str = None):
+        self.workers = available_cpus() if workers is None else max(0, int(workers))
+        self.parser = resolve_parser(parser)
+        self._executor = None
+
+    async def start(self):
+        if self.workers and self._executor is None:
+            # Streamlit などスレッドを使う親プロセスからでも安全に起動できるよう spawn を使う
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            logger.info("Extraction pool started (workers=%d, parser=%s)", self.workers, self.parser)
+        return self
+
+    async def close(self):
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # ----- extract_title_and_body と同じ結果（title / body / script_rendered）を返す -----
+    async def extract(self, html, from_encoding: str = None, max_body_chars: int = DEFAULT_MAX_BODY_CHARS,
+                      note: str = None) -> dict:
+        executor = self._executor
+        if executor is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(executor, extract_title_and_body, html, from_encoding, self.parser,
+                                                  max_body_chars, note)
+            except BrokenProcessPool:
+                # ワーカーが落ちた（メモリ不足など）場合は、以降はスレッドで解析する
+                if self._executor is executor:
+                    logger.warning("Extraction worker process died; parsing in threads from now on")
+                    self._executor = None
+                    executor.shutdown(wait=False, cancel_futures=True)
+        return await asyncio.to_thread(extract_title_and_body, html, from_encoding, self.parser, max_body_chars, note)
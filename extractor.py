@@ -0,0 +1,285 @@
+import re
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.builder import builder_registry
+
+# ----- 本文抽出（readability 方式） -----
+# ナビゲーション・フッター・Cookieバナーなどを取り除いた上で、記事本文らしい要素を1つ選び、
+# 見出し・リスト・コード・引用・段落を次の軽量なマークアップ（1行1要素）に変換する。
+#   "# " / "## " / "### "  見出し1〜3
+#   "- "                   箇条書き
+#   "1. "                  番号付きリスト
+#   "> "                   引用
+#   "```" 〜 "```"          コード
+#   それ以外                段落（記号で始まる段落は先頭に "\" を付けてエスケープ）
+# このテキストは notion_blocks.text_to_blocks で対応するNotionブロックに変換する。
+
+NOISE_TAGS = ["script", "style", "noscript", "template", "nav", "footer", "aside", "form", "button",
+              "iframe", "svg", "canvas", "select", "input", "dialog"]
+NEGATIVE_RE = re.compile(
+    r"cookie|consent|gdpr|banner|popup|modal|newsletter|subscribe|share|social|related|recommend|"
+    r"comment|sidebar|widget|menu|breadcrumb|advert|\bads?\b|sponsor|promo|footer|masthead|"
+    r"nav|pagination|pager|toolbar|skip-link|signup|login|paywall",
+    re.I,
+)
+POSITIVE_RE = re.compile(r"article|content|entry|post|story|main|text|body|blog|news", re.I)
+MARKUP_PREFIX_RE = re.compile(r"^(#{1,3} |- |\d+\. |> |```|\\)")
+MIN_ARTICLE_TEXT_LENGTH = 200  # 抽出結果がこれより短ければ、ページ全体のテキストを使う
+MIN_STATIC_TEXT_LENGTH = 200   # 静的HTMLの本文がこれより短ければJSで描画されるページとみなす
+SPA_TEXT_LENGTH = 1500         # SPAの目印があるページは、本文がこれより短ければブラウザで取り直す
+SCRIPT_ROOT_IDS = ("root", "app", "__next", "__nuxt", "___gatsby")
+DEFAULT_MAX_BODY_CHARS = 200_000  # 本文として登録する最大文字数（0 / None は無制限）
+MIN_MAX_BODY_CHARS = 1000         # 本文の上限の最小値（これより小さい値はこの値として扱う）
+TRUNCATION_MARKER = "（本文が長いため、以降の {omitted:,} 文字を省略しました）"
+
+# HTMLパーサー：lxml がインストールされていれば使い（html.parser より数倍速い）、無ければ標準の html.parser
+PARSER_AUTO = "auto"
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = "lxml"
+except ImportError:
+    DEFAULT_PARSER = "html.parser"
+
+
+# ----- パーサー名（None / "auto" は DEFAULT_PARSER）を、使えることを確かめてから返す -----
+def resolve_parser(name: str = None) -> str:
+    if not name or name == PARSER_AUTO:
+        return DEFAULT_PARSER
+    if builder_registry.lookup(name) is None:
+        raise ValueError(f"HTMLパーサー「{name}」は使えません（lxml / html5lib はインストールが必要です）")
+    return name
+
+
+def _attr_text(el: Tag) -> str:
+    classes = el.get("class") or []
+    if isinstance(classes, str):
+        classes = [classes]
+    return " ".join(classes) + " " + (el.get("id") or "")
+
+
+def _class_weight(el: Tag) -> int:
+    attrs = _attr_text(el)
+    weight = 0
+    if NEGATIVE_RE.search(attrs):
+        weight -= 25
+    if POSITIVE_RE.search(attrs):
+        weight += 25
+    return weight
+
+
+def _inline_text(el) -> str:
+    return " ".join(el.get_text(" ").split())
+
+
+def _link_density(el: Tag, text_length: int) -> float:
+    if not text_length:
+        return 0.0
+    link_length = sum(len(_inline_text(a)) for a in el.find_all("a"))
+    return min(1.0, link_length / text_length)
+
+
+# ----- 本文と関係の無い要素を取り除く -----
+def _remove_noise(soup) -> None:
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+    for tag in soup.find_all("header"):
+        if tag.find_parent("article") is None:
+            tag.decompose()
+    # class/id からノイズと判断できる要素（本文らしいclassも持つものと、大きな要素は残す）
+    candidates = [
+        el for el in soup.find_all(True)
+        if el.name not in ("html", "body", "article", "main") and el.attrs is not None
+        and NEGATIVE_RE.search(_attr_text(el)) and not POSITIVE_RE.search(_attr_text(el))
+    ]
+    for el in candidates:
+        if el.decomposed:
+            continue
+        if len(_inline_text(el)) < 2000 or _link_density(el, len(_inline_text(el))) > 0.5:
+            el.decompose()
+
+
+# ----- 本文を含む要素を選ぶ -----
+def _find_article_root(soup) -> Tag:
+    articles = soup.find_all("article")
+    if articles:
+        best = max(articles, key=lambda el: len(_inline_text(el)))
+        if len(_inline_text(best)) >= MIN_ARTICLE_TEXT_LENGTH:
+            return best
+    main = soup.find("main") or soup.find(attrs={"role": "main"})
+    if main is not None and len(_inline_text(main)) >= MIN_ARTICLE_TEXT_LENGTH:
+        return main
+
+    # 段落のテキスト量を親（と祖父母）に加点し、リンクの多い要素を減点する
+    scores = {}
+    for p in soup.find_all(["p", "pre", "td", "blockquote"]):
+        text = _inline_text(p)
+        if len(text) < 25:
+            continue
+        score = 1 + text.count(",") + text.count("、") + min(len(text) // 100, 3)
+        parent = p.parent
+        for share in (1.0, 0.5):
+            if parent is None or not isinstance(parent, Tag) or parent.name in ("html", "[document]"):
+                break
+            if id(parent) not in scores:
+                scores[id(parent)] = [parent, _class_weight(parent)]
+            scores[id(parent)][1] += score * share
+            parent = parent.parent
+
+    best, best_score = None, 0.0
+    for el, score in scores.values():
+        score *= 1 - _link_density(el, len(_inline_text(el)))
+        if score > best_score:
+            best, best_score = el, score
+    return best or soup.find("body") or soup
+
+
+def _paragraph(text: str) -> str:
+    return "\\" + text if MARKUP_PREFIX_RE.match(text) else text
+
+
+# ----- プレーンテキスト（get_text や innerText の結果）をマークアップとして読まれないようにする -----
+def escape_plain_text(text: str) -> str:
+    return "\n".join(_paragraph(line) for line in text.split("\n"))
+
+
+# ----- 要素をマークアップの行に変換する -----
+def _emit(el, lines: list) -> None:
+    if type(el) is NavigableString:  # コメントやDOCTYPEは除く
+        text = " ".join(str(el).split())
+        if text:
+            lines.append(_paragraph(text))
+        return
+    if not isinstance(el, Tag):
+        return
+
+    name = el.name
+    if name in ("h1", "h2", "h3", "h4", "h5", "h6"):
+        text = _inline_text(el)
+        if text:
+            level = min(int(name[1]), 3)
+            lines.append("#" * level + " " + text)
+    elif name in ("ul", "ol"):
+        number = 0
+        for li in el.find_all("li", recursive=False):
+            number += 1
+            nested = li.find_all(["ul", "ol"], recursive=False)
+            for sub in nested:
+                sub.extract()
+            text = _inline_text(li)
+            if text:
+                lines.append(f"{number}. {text}" if name == "ol" else f"- {text}")
+            for sub in nested:
+                _emit(sub, lines)
+    elif name == "pre":
+        code = el.get_text().strip("\n")
+        if code.strip():
+            lines.append("```")
+            # コード中の "```" だけの行でコードが終わったと解釈されないようにする
+            lines.extend("` ``" if line.strip() == "```" else line for line in code.split("\n"))
+            lines.append("```")
+    elif name == "blockquote":
+        text = _inline_text(el)
+        if text:
+            lines.append("> " + text)
+    elif name == "table":
+        for tr in el.find_all("tr"):
+            cells = [_inline_text(cell) for cell in tr.find_all(["th", "td"])]
+            row = " | ".join(cell for cell in cells if cell)
+            if row:
+                lines.append(_paragraph(row))
+    elif name in ("p", "figcaption", "dt", "dd", "summary"):
+        text = _inline_text(el)
+        if text:
+            lines.append(_paragraph(text))
+    elif name in ("img", "picture", "video", "audio", "hr", "br"):
+        return
+    else:
+        # div/section などは子要素をたどる。インライン要素だけの塊は1つの段落にまとめる
+        inline = []
+        for child in el.children:
+            if type(child) is NavigableString or (isinstance(child, Tag) and child.name in INLINE_TAGS):
+                inline.append(child)
+                continue
+            if not isinstance(child, Tag):
+                continue
+            _flush_inline(inline, lines)
+            _emit(child, lines)
+        _flush_inline(inline, lines)
+
+
+INLINE_TAGS = {"a", "abbr", "b", "bdi", "bdo", "cite", "code", "data", "del", "dfn", "em", "i", "ins", "kbd",
+               "mark", "q", "s", "samp", "small", "span", "strong", "sub", "sup", "time", "u", "var", "br", "wbr"}
+
+
+def _flush_inline(inline: list, lines: list) -> None:
+    if not inline:
+        return
+    text = " ".join(" ".join((str(node) if isinstance(node, NavigableString) else node.get_text(" ")).split()) for node in inline)
+    text = " ".join(text.split())
+    if text:
+        lines.append(_paragraph(text))
+    inline.clear()
+
+
+# ----- 解析済みのsoupから本文を抽出し、マークアップのテキストを返す（見つからなければ空文字） -----
+def extract_main_content(soup) -> str:
+    _remove_noise(soup)
+    root = _find_article_root(soup)
+    lines = []
+    _emit(root, lines)
+    return "\n".join(lines)
+
+
+# ----- 本文を max_chars 文字までに切り詰め、省略したことが分かる一文を末尾に付ける -----
+# なるべく段落・行の区切りで切り、コードブロックの途中で切れた場合は閉じておく。
+# 結果は一文を含めて max_chars 文字以内なので、切り詰め済みの本文をもう一度渡してもそのまま返る
+# （max_chars は MIN_MAX_BODY_CHARS 未満なら MIN_MAX_BODY_CHARS として扱う）。
+# total には元の本文の長さを渡せる（ブラウザ側で先に切り詰めた場合など）。
+# note を渡すと、長さに関係なく TRUNCATION_MARKER の代わりにその一文を末尾に付ける（HTMLの途中までしか読めなかった場合など）。
+def truncate_body(text: str, max_chars: int = DEFAULT_MAX_BODY_CHARS, total: int = None, note: str = None) -> str:
+    total = len(text) if total is None else total
+    suffix = len(note) + 2 if note is not None else 0
+    if max_chars:
+        max_chars = max(max_chars, MIN_MAX_BODY_CHARS)
+    if not max_chars or total + suffix <= max_chars:
+        return text if note is None else text.rstrip() + "\n\n" + note
+    reserved = len(note if note is not None else TRUNCATION_MARKER.format(omitted=total)) + len("\n```\n\n")
+    room = max_chars - reserved
+    cut = text[:room]
+    boundary = cut.rfind("\n", room // 2)
+    if boundary > 0:
+        cut = cut[:boundary]
+    cut = cut.rstrip()
+    if sum(1 for line in cut.split("\n") if line == "```") % 2:
+        cut += "\n```"
+    return cut + "\n\n" + (note if note is not None else TRUNCATION_MARKER.format(omitted=total - len(cut)))
+
+
+# ----- HTMLからタイトルと本文を取り出す -----
+# 本文は extract_main_content で記事部分だけを抽出したマークアップ（取れなければページ全体のテキスト）。
+# script_rendered は「本文が空に近い」「SPAの空のルート要素や、JavaScriptを要求するnoscriptがある」など、
+# JSで描画されるページらしい場合に True になる。
+# CPUを使う処理なので、スクレイピング中は ExtractionPool（別プロセス）から呼ぶ。
+# 本文は max_body_chars 文字までに切り詰めて返す（別プロセスから大きな文字列を受け取らないため）。
+# note を渡すと本文の末尾にその一文を付ける（truncate_body を参照）。
+def extract_title_and_body(html, from_encoding: str = None, parser: str = None,
+                           max_body_chars: int = DEFAULT_MAX_BODY_CHARS, note: str = None) -> dict:
+    options = {"from_encoding": from_encoding} if isinstance(html, bytes) and from_encoding else {}
+    soup = BeautifulSoup(html, resolve_parser(parser), **options)
+
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    requires_js = any("javascript" in tag.get_text().lower() for tag in soup.find_all("noscript"))
+    empty_root = any(
+        root is not None and len(root.get_text(strip=True)) < MIN_STATIC_TEXT_LENGTH
+        for root in (soup.find(id=root_id) for root_id in SCRIPT_ROOT_IDS)
+    )
+
+    # innerText と同様に、表示されない要素の中身は本文に含めない
+    for tag in soup(["script", "style", "noscript", "template"]):
+        tag.decompose()
+    body_tag = soup.find("body")
+    body = (body_tag or soup).get_text(separator="\n", strip=True)
+    script_rendered = len(body) < MIN_STATIC_TEXT_LENGTH or ((requires_js or empty_root) and len(body) < SPA_TEXT_LENGTH)
+
+    article = extract_main_content(soup)
+    body = article if len(article) >= MIN_ARTICLE_TEXT_LENGTH else escape_plain_text(body)
+    return {"title": title, "body": truncate_body(body, max_body_chars, note=note), "script_rendered": script_rendered}
@@ -0,0 +1,473 @@
+import logging
+import time
+from datetime import datetime, timezone
+from collections import Counter
+from scraper import BrowserPool, HttpFetcher, fetch_page_info, TIER_CACHE
+from pipeline import run_pipeline, SUCCESS, FAILURE, SKIPPED
+from notion_writer import NotionWriter, PartialPageError
+from scrape_cache import ScrapeCache
+from extraction_pool import ExtractionPool
+from extractor import DEFAULT_MAX_BODY_CHARS, truncate_body
+from journal import ImportJournal
+from notion_blocks import text_to_blocks
+from dedupe import DuplicateIndex, fetch_existing_urls, DUPLICATE_STATUS, DUPLICATE_IN_DATABASE
+from metrics import RunMetrics, DEFAULT_METRICS_PATH, get_logger, timed, timed_iter
+
+logger = get_logger("importer")
+
+UNSELECTED = "― 未選択 ―"
+CSV_COLUMNS = ["title", "url", "time_added", "tags", "status"]
+
+# ----- Notion 用ユーティリティ -----
+def build_title_property(col_value: str):
+    return {"title": [{"text": {"content": col_value}}]}
+
+def build_url_property(col_value: str):
+    return {"url": col_value}
+
+def build_date_property(unix_ts: int):
+    dt = datetime.fromtimestamp(unix_ts, timezone.utc)
+    date_str = dt.strftime("%Y-%m-%d")
+    return {"date": {"start": date_str}}
+
+def build_multi_select_property(tag_str: str):
+    if not isinstance(tag_str, str) or not tag_str.strip(): # str型であること、空でないことを確認
+        return {"multi_select": []}
+    tags = [t.strip() for t in tag_str.split(",") if t.strip()]
+    return {"multi_select": [{"name": tag} for tag in tags]}
+
+def build_select_property(status_value: str):
+    if not status_value: # status_valueがNoneや空文字の場合
+        return {"select": None}
+    return {"select": {"name": str(status_value)}} # 念のためstrにキャスト
+
+# ----- データベースのプロパティ定義を取得する -----
+def fetch_database_properties(notion, database_id: str) -> dict:
+    database = notion.databases.retrieve(database_id=database_id)
+    return database.get("properties", {})
+
+# ----- CSVの列ごとに、1行分の値からプロパティJSONを作る（None を返した列は登録しない） -----
+def _title_value(idx, item, notify):
+    title = item["title"]
+    # タイトルが長すぎる場合、Notionの制限(2000文字)を考慮 (APIレベルでの制限は不明だが念のため)
+    final_title = title if title and str(title).strip() else "タイトルなし"
+    return build_title_property(str(final_title)[:1990]) # 少し短めに
+
+def _url_value(idx, item, notify):
+    return build_url_property(item["url"]) if item["url"] else None
+
+def _date_value(idx, item, notify):
+    time_val = item["time_added"]
+    if time_val is None:
+        return None
+    try:
+        return build_date_property(int(time_val))
+    except (ValueError, TypeError):
+        notify("warning", f"行 {idx}: time_added ('{time_val}') をUnixタイムスタンプに変換できませんでした。")
+        return {"date": None}
+
+def _tags_value(idx, item, notify):
+    return build_multi_select_property(item["tags"])
+
+def _status_value(idx, item, notify):
+    return build_select_property(item["status"])
+
+# CSVの列 → (登録先に必要なプロパティの型, 値を作る関数)
+PROPERTY_BUILDERS = {
+    "title": ("title", _title_value),
+    "url": ("url", _url_value),
+    "time_added": ("date", _date_value),
+    "tags": ("multi_select", _tags_value),
+    "status": ("select", _status_value),
+}
+
+
+# ----- マッピングを一度だけ検証して、1行分のプロパティJSONを作る関数にまとめる -----
+# 存在しないプロパティや型の合わないプロパティにマッピングされた列は登録せず、
+# 理由を problems に入れておく（行ごとに警告を出さずに、開始前に一度だけ表示するため）。
+class PropertyBuilder:
+    def __init__(self, mapping: dict, properties: dict):
+        self.fields = []    # (プロパティ名, 値を作る関数)
+        self.problems = []  # 登録しない列とその理由
+        for column, (expected_type, value_of) in PROPERTY_BUILDERS.items():
+            target = mapping.get(column)
+            if not target or target == UNSELECTED:
+                continue
+            if target not in properties:
+                self.problems.append(f"「{target}」はデータベースにありません。{column} の登録をスキップします。")
+                continue
+            actual_type = properties[target].get("type")
+            if actual_type != expected_type:
+                self.problems.append(f"「{target}」は {expected_type} 型ではありません（{actual_type} 型）。{column} の登録をスキップします。")
+                continue
+            self.fields.append((target, value_of))
+
+    def __call__(self, idx: int, item: dict, notify=None) -> dict:
+        notify = notify or print_notice
+        property_json = {}
+        for target, value_of in self.fields:
+            value = value_of(idx, item, notify)
+            if value is not None:
+                property_json[target] = value
+        return property_json
+
+# ----- インポートの設定値（UI/CLIの両方から指定する） -----
+class ImportSettings:
+    def __init__(self, register_body: bool = True, scrape_concurrency: int = 4, upload_concurrency: int = 6,
+                 browser_pool_size: int = 1, max_pages_per_browser: int = 200,
+                 per_domain_concurrency: int = 2, per_domain_rate: float = 1.0,
+                 use_cache: bool = True, cache_ttl_seconds: float = 7 * 24 * 3600, cache_max_bytes: int = 512 * 1024 * 1024,
+                 resume: bool = True, http_first: bool = True, block_resources: bool = True,
+                 metrics_path: str = DEFAULT_METRICS_PATH, dedupe: bool = True,
+                 extract_workers: int = None, html_parser: str = None, max_body_chars: int = DEFAULT_MAX_BODY_CHARS):
+        self.register_body = register_body
+        self.scrape_concurrency = scrape_concurrency
+        self.upload_concurrency = upload_concurrency
+        self.browser_pool_size = browser_pool_size
+        self.max_pages_per_browser = max_pages_per_browser
+        self.per_domain_concurrency = per_domain_concurrency
+        self.per_domain_rate = per_domain_rate
+        self.use_cache = use_cache
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_max_bytes = cache_max_bytes
+        self.resume = resume
+        self.http_first = http_first  # まずHTTPで取得し、必要な場合だけブラウザを使う
+        self.block_resources = block_resources  # ブラウザで画像・フォント・動画・広告/解析を読み込まない
+        self.metrics_path = metrics_path  # 行ごとの処理時間を書き出すJSONLファイル（None なら書き出さない）
+        self.dedupe = dedupe  # データベースに登録済みのURLと、CSV内で重複したURLの行をスキップする
+        self.extract_workers = extract_workers  # HTML解析に使うプロセス数（None は使えるコア数、0 は別プロセスを使わない）
+        self.html_parser = html_parser  # BeautifulSoup のパーサー（None / "auto" は lxml があれば lxml）
+        self.max_body_chars = max_body_chars  # 本文として登録する最大文字数（超えた分は省略し、その旨を末尾に書く。0 は無制限）
+
+# ----- 通知の既定の出力先（UIが無い場合はログへ） -----
+def print_notice(level: str, message: str):
+    logger.log(getattr(logging, level.upper(), logging.INFO), message)
+
+
+# ----- CSVの行をスクレイピング → プロパティ/本文ブロック組み立て → Notion登録 するインポート処理 -----
+# Streamlit UI と CLI の両方から使う。ユーザー向けのメッセージは notify(level, message) で通知する
+# （level は "info" / "warning" / "error"）。
+class Importer:
+    def __init__(self, notion, database_id: str, mapping: dict, properties: dict,
+                 settings: ImportSettings = None, job_id: str = None, notify=None):
+        self.database_id = database_id
+        self.mapping = mapping
+        self.properties = properties
+        self.property_builder = PropertyBuilder(mapping, properties)
+        self.settings = settings or ImportSettings()
+        self.job_id = job_id
+        self.notify = notify or print_notice
+        self.writer = NotionWriter(notion, database_id, max_connections=self.settings.upload_concurrency + 2)
+        self.cache = None
+        self.journal = None
+        self.metrics = None
+        self.duplicates = None  # DuplicateIndex
+        self._duplicate_rows = {}  # 行番号 → 重複の種類（スクレイピング前に判定する）
+        self._partial_pages = {}   # 行番号 → 前回の実行で本文が途中までになったページ（作り直す前にアーカイブする）
+        self.pool = None
+        self.http = None
+        self.extraction = None
+        self.tier_counts = Counter()  # 取得方法（http/browser/cache）ごとの件数
+        self.stats = None
+        self.resumed_rows = 0
+
+    def _mapped(self, column: str):
+        target = self.mapping.get(column)
+        return target if target and target != UNSELECTED else None
+
+    # ----- 1行分の処理（スクレイピング段）：CSVの1行からNotion登録用のデータを作る -----
+    async def scrape_row(self, idx: int, row):
+        register_body = self.settings.register_body
+        cache = self.cache
+        journal = self.journal
+
+        # getattrで列が存在しない場合に備え、デフォルト値を設定
+        raw_title  = getattr(row, "title", "タイトル不明") # CSVのタイトル列
+        url_val    = getattr(row, "url", None)      # CSVのURL列
+        time_val   = getattr(row, "time_added", None)
+        tags_val   = getattr(row, "tags", "")       # タグは空文字をデフォルトに
+        status_val = str(getattr(row, "status", "")) # statusは文字列として扱う
+
+        info = None
+        item = {
+            "title": raw_title, # Notion登録用のタイトル。スクレイピング成功なら上書き
+            "url": url_val,
+            "time_added": time_val,
+            "tags": tags_val,
+            "status": status_val,
+            "body": "",
+            "skip": False,
+            "tier": None,
+            "scrape_status": None,
+            "started": time.perf_counter(),
+            "timings": {},  # 段階ごとの処理時間（秒）
+        }
+        timings = item["timings"]
+
+        duplicate = self._duplicate_rows.pop(idx, None)
+        if duplicate:
+            where = "データベースに登録済み" if duplicate == DUPLICATE_IN_DATABASE else "CSVの前の行と同じURL"
+            logger.info("Row %s: duplicate URL (%s), skipping %s", idx, duplicate, url_val)
+            item["skip"] = True
+            item["scrape_status"] = f"{DUPLICATE_STATUS} ({duplicate})"
+            if journal:
+                journal.mark_skipped(idx, url_val, item["scrape_status"])
+            self._record_row(idx, SKIPPED, item, duplicate=duplicate)
+            return item
+
+        # URL列が存在し、それが有効なURL形式の場合にスクレイピングを試みる
+        if url_val and isinstance(url_val, str) and url_val.startswith(("http://", "https://")):
+            logger.debug("Row %s: scraping %s", idx, url_val)
+
+            if cache:
+                with timed(timings, "cache"):
+                    info = cache.get(url_val)
+            if info is not None:
+                info["tier"] = TIER_CACHE
+            else:
+                info = await fetch_page_info(url_val, self.pool, self.http, timings, self.extraction,
+                                             max_body_chars=self.settings.max_body_chars)
+                if cache:
+                    cache.put(url_val, info)
+            self.tier_counts[info.get("tier")] += 1
+
+            page_status_code = info.get("status")
+            item["tier"] = info.get("tier")
+            item["scrape_status"] = page_status_code
+
+            if page_status_code == 404:
+                self.notify("warning", f"行 {idx}: URLが404です。スキップ → {url_val}")
+                item["skip"] = True
+                try:
+                    # 前回途中まで作成したページは、作り直さないのでここで片付ける
+                    await self._archive_partial_page(idx)
+                except Exception as e:
+                    self.notify("error", f"行 {idx}: 前回途中まで作成したページをアーカイブできませんでした: {e}")
+                    if journal:
+                        journal.mark_failed(idx, e)  # ページIDは残り、次の再開でもう一度アーカイブする
+                    self._record_row(idx, SKIPPED, item, error=str(e)[:500])
+                    return item
+                if journal:
+                    journal.mark_skipped(idx, url_val, page_status_code, info.get("tier"))
+                self._record_row(idx, SKIPPED, item)
+                return item
+            elif isinstance(page_status_code, str) and ("Error" in page_status_code or "No Response" in page_status_code):
+                self.notify("warning", f"行 {idx}: スクレイピングエラー ({page_status_code})。本文なし、CSVタイトルで続行 → {url_val}")
+                # item["title"] は raw_title のまま
+            else: # 成功または404以外のエラーステータス
+                # スクレイピングで取得したタイトルがあればそれを使用
+                if info.get("title") and info.get("title") != "No Title" and info.get("title") != "Error Getting Title":
+                    item["title"] = info.get("title")
+                else:
+                    logger.debug("Row %s: scraped title was %r, using CSV title", idx, info.get("title"))
+
+                if register_body:
+                    # キャッシュには上限を変える前の長い本文が残っていることがあるので、ここでも切り詰める
+                    item["body"] = truncate_body(info.get("body") or "", self.settings.max_body_chars)
+                    if not item["body"]:
+                        self.notify("warning", f"行 {idx}: 本文が取得できませんでした。URL: {url_val}")
+        else:
+            self.notify("warning", f"行 {idx}: 有効なURLがCSVのurl列にありません。スキップまたはCSVタイトルのみ使用。 URL: '{url_val}'")
+            # item["title"] は raw_title のまま、body は空のまま
+
+        if journal:
+            journal.mark_scraped(idx, url_val, item["scrape_status"], item["tier"])
+        return item
+
+    # ----- 1行分のNotionプロパティJSONを組み立てる -----
+    def build_properties(self, idx: int, item: dict) -> dict:
+        return self.property_builder(idx, item, self.notify)
+
+    # ----- 1行分の処理（登録段）：プロパティと本文ブロックを組み立ててNotionに登録する -----
+    async def upload_row(self, idx: int, row, item: dict):
+        register_body = self.settings.register_body
+        journal = self.journal
+        body_text = item["body"]
+        timings = item["timings"]
+
+        # NotionプロパティJSONの構築
+        with timed(timings, "build_properties"):
+            property_json = self.build_properties(idx, item)
+
+        # 本文ブロックの準備（ブロックは NotionWriter が100件ずつ取り出すときに作られるので、
+        # その時間を split として測り、Notion登録の時間から除く）
+        children_blocks = []
+        if register_body and body_text and body_text.strip():
+            children_blocks = timed_iter(text_to_blocks(body_text), timings, "split")
+        elif register_body:
+            logger.debug("Row %s: no body text, creating the page without blocks", idx)
+
+        # Notionページ作成（レート制御とリトライは NotionWriter が行う。その間もスクレイピングは進む）
+        started = time.perf_counter()
+        split_before = timings.get("split", 0.0)
+        try:
+            await self._archive_partial_page(idx)
+            report = await self.writer.create_page(property_json, children_blocks)
+        except Exception as e:
+            self.notify("error", f"行 {idx} 登録エラー: {e}")
+            logger.debug("Row %s: failed properties: %s", idx, property_json)
+            if journal:
+                # ページまでは作成できた場合は、そのページIDを残して再開時に片付ける
+                journal.mark_failed(idx, e, page_id=e.page_id if isinstance(e, PartialPageError) else None)
+            self._record_notion_time(timings, started, split_before)
+            self._record_row(idx, FAILURE, item, error=str(e)[:500])
+            return FAILURE
+
+        self._record_notion_time(timings, started, split_before)
+        if journal:
+            journal.mark_done(idx, report["page"].get("id"))
+        self._record_row(idx, SUCCESS, item, blocks=report["blocks"], append_requests=report["append_requests"],
+                         append_seconds=round(report["append_seconds"], 4))
+        return SUCCESS
+
+    # ----- 前回の実行で本文が途中までになったこの行のページをアーカイブし、ジャーナルから消す -----
+    async def _archive_partial_page(self, idx: int):
+        page_id = self._partial_pages.pop(idx, None)
+        if not page_id:
+            return
+        logger.info("Row %s: archiving page %s left incomplete by the previous run", idx, page_id)
+        await self.writer.archive_page(page_id)
+        if self.journal:
+            self.journal.clear_page_id(idx)
+
+    @staticmethod
+    def _record_notion_time(timings: dict, started: float, split_before: float):
+        split = timings.get("split", 0.0) - split_before
+        timings["notion_create"] = time.perf_counter() - started - split
+
+    # ----- 1行分の結果と段階ごとの処理時間をログとメトリクス（JSONL）に記録する -----
+    def _record_row(self, idx: int, result: str, item: dict, **fields):
+        timings = item["timings"]
+        timings["total"] = time.perf_counter() - item["started"]
+        logger.info("Row %s: %s in %.2fs (%s) %s", idx, result, timings["total"], item["tier"] or "-", item["url"] or "")
+        if self.metrics is not None:
+            self.metrics.record_row(idx, result, timings, url=item["url"], tier=item["tier"],
+                                    scrape_status=item["scrape_status"], **fields)
+
+    def _url_to_schedule(self, idx: int, row):
+        # 重複でスキップする行とキャッシュ済みのURLはアクセスしないので、ドメインごとの待ち時間なしで払い出す
+        url_val = getattr(row, "url", None)
+        if idx in self._duplicate_rows:
+            return None
+        if self.cache and isinstance(url_val, str) and self.cache.contains(url_val):
+            return None
+        return url_val
+
+    # ----- 重複判定の準備：URLにマッピングしたプロパティから、データベースに登録済みのURLを読み込む -----
+    async def _load_duplicate_index(self):
+        existing = set()
+        url_property = self._mapped("url")
+        if url_property:
+            try:
+                existing = await fetch_existing_urls(self.writer, url_property, self.properties.get(url_property, {}))
+                self.notify("info", f"データベースに登録済みのURL {len(existing)} 件と重複する行はスキップします。")
+            except Exception as e:
+                self.notify("warning", f"登録済みURLの取得に失敗しました。CSV内の重複だけをスキップします: {e}")
+        return DuplicateIndex(existing)
+
+    # ----- CSVの行を順に重複判定し、重複した行に印を付けながらそのまま流す -----
+    # 前回までに処理済みの行は流さないが、そのURLは覚えておく（後の行にある同じURLを重複としてスキップする）。
+    def _mark_duplicates(self, rows, completed_rows=frozenset()):
+        for idx, row in rows:
+            url_val = getattr(row, "url", None)
+            if idx in completed_rows:
+                self.duplicates.remember(url_val)
+                continue
+            if idx in self._partial_pages:
+                # データベースにある同じURLのページは、この行が前回途中まで書き込んだもの（作り直すので重複とみなさない）
+                self.duplicates.remember(url_val)
+                yield idx, row
+                continue
+            reason = self.duplicates.check(url_val)
+            if reason:
+                self._duplicate_rows[idx] = reason
+            yield idx, row
+
+    # ----- rows（(行番号, 行) の iterable）をすべて処理する -----
+    # on_progress(stats, writer) は1行終わるごとに呼ばれる。
+    async def run(self, rows, total: int, on_progress=None):
+        settings = self.settings
+        completed_rows = set()
+        self._partial_pages = {}
+        for problem in self.property_builder.problems:
+            self.notify("warning", problem)
+        if settings.use_cache:
+            self.cache = ScrapeCache(ttl_seconds=settings.cache_ttl_seconds, max_bytes=settings.cache_max_bytes)
+        if self.job_id:
+            self.journal = ImportJournal(self.job_id)
+            if settings.resume:
+                completed_rows = self.journal.completed_rows()
+                self._partial_pages = self.journal.partial_pages()
+                if completed_rows:
+                    self.notify("info", f"前回までに処理済みの {len(completed_rows)} 行をスキップして再開します。")
+            else:
+                self.journal.reset()
+        self.resumed_rows = len(completed_rows)
+        self.metrics = RunMetrics(self.job_id, path=settings.metrics_path)
+        self._duplicate_rows = {}
+        if self._partial_pages:
+            self.notify("info", f"前回本文が途中までになった {len(self._partial_pages)} 件のページは、アーカイブしてから作り直します。")
+        try:
+            # Notionへのリクエストは、接続プールを共有する非同期クライアントで送る（スクレイピングと並行して複数件を送信する）
+            async with self.writer:
+                if settings.dedupe:
+                    self.duplicates = await self._load_duplicate_index()
+
+                # インポート全体で1つのブラウザプールを使い回し、複数URLを並行してスクレイピングする
+                # HTMLの解析はイベントループを止めないよう、別プロセスのプールで行う
+                async with BrowserPool(size=settings.browser_pool_size, max_pages_per_browser=settings.max_pages_per_browser,
+                                       block_resources=settings.block_resources) as pool, \
+                           ExtractionPool(workers=settings.extract_workers, parser=settings.html_parser) as extraction, \
+                           HttpFetcher(max_connections=max(4, settings.scrape_concurrency * 2), extraction=extraction,
+                                       max_body_chars=settings.max_body_chars) as http:
+                    self.pool = pool
+                    self.extraction = extraction
+                    self.http = http if settings.http_first else None
+                    if self.duplicates is not None:
+                        pending = self._mark_duplicates(rows, completed_rows)
+                    else:
+                        pending = ((idx, row) for idx, row in rows if idx not in completed_rows)
+                    self.stats = await run_pipeline(
+                        pending,
+                        scrape=self.scrape_row,
+                        upload=self.upload_row,
+                        concurrency=settings.scrape_concurrency,
+                        upload_concurrency=settings.upload_concurrency,
+                        total=max(0, total - len(completed_rows)),
+                        on_progress=(lambda stats: on_progress(stats, self.writer)) if on_progress else None,
+                        url_of=self._url_to_schedule,
+                        per_domain_concurrency=settings.per_domain_concurrency,
+                        per_domain_rate=settings.per_domain_rate,
+                    )
+        finally:
+            self.pool = None
+            self.http = None
+            self.extraction = None
+            if self.cache:
+                self.cache.close()
+            if self.journal:
+                self.journal.close()
+            self.metrics.close()
+
+        logger.info("Import complete. Total: %d, success: %d, failure: %d, skipped: %d",
+                    total, self.stats.success, self.stats.failure, self.stats.skipped)
+        return self.summary()
+
+    def summary(self) -> dict:
+        stats = self.stats
+        return {
+            "total": stats.total if stats else 0,
+            "processed": stats.processed if stats else 0,
+            "success": stats.success if stats else 0,
+            "failure": stats.failure if stats else 0,
+            "skipped": stats.skipped if stats else 0,
+            "resumed": self.resumed_rows,
+            "cache_hits": self.cache.hits if self.cache else None,
+            "cache_misses": self.cache.misses if self.cache else None,
+            "blocks_written": self.writer.blocks_written,
+            "append_seconds": round(self.writer.append_seconds, 3),
+            "notion_retries": self.writer.retry_count,
+            "tiers": dict(self.tier_counts),
+            "duplicates": dict(self.duplicates.counts) if self.duplicates else {},
+            "stages": self.metrics.summary() if self.metrics else {},
+        }
@@ -0,0 +1,165 @@
+import hashlib
+import sqlite3
+import time
+
+DEFAULT_JOURNAL_PATH = ".import_journal.sqlite3"
+
+PENDING = "pending"   # スクレイピング済み・Notion未登録
+DONE = "done"         # Notionページ作成済み
+FAILED = "failed"     # 登録に失敗
+SKIPPED = "skipped"   # 404などでスキップ
+COMPLETED_STATES = (DONE, SKIPPED)
+
+
+# ----- インポート単位のID：同じDBに同じCSVを入れ直す場合は同じIDになる -----
+# csv_source はCSVの中身（bytes）またはファイルパス。パスの場合は少しずつ読んでハッシュする。
+def make_job_id(database_id: str, csv_source) -> str:
+    digest = hashlib.sha256()
+    digest.update((database_id or "").encode("utf-8"))
+    digest.update(b"\0")
+    if isinstance(csv_source, bytes):
+        digest.update(csv_source)
+    else:
+        with open(csv_source, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+# ----- 行ごとの処理結果（スクレイピング結果と作成したNotionページID）を記録するジャーナル -----
+# 記録は flush_every 件または flush_interval 秒ごとにまとめてSQLiteに書き込む。
+# ただし、Notionにページを作成した行（登録済み・途中まで作成済み）の記録はすぐに書き込む。
+# 再開時は completed_rows() に含まれる行（登録済み・スキップ済み）を飛ばし、
+# 失敗した行と記録の無い行だけを処理し直す。
+class ImportJournal:
+    def __init__(self, job_id: str, path: str = DEFAULT_JOURNAL_PATH, flush_every: int = 20, flush_interval: float = 2.0):
+        self.job_id = job_id
+        self.path = path
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rows (
+                job           TEXT NOT NULL,
+                idx           INTEGER NOT NULL,
+                url           TEXT,
+                state         TEXT NOT NULL,
+                scrape_status TEXT,
+                tier          TEXT,
+                page_id       TEXT,
+                error         TEXT,
+                updated       REAL NOT NULL,
+                PRIMARY KEY (job, idx)
+            )
+            """
+        )
+        # 取得方法（tier）の列が無い古いジャーナルには列を追加する
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(rows)")}
+        if "tier" not in columns:
+            self._conn.execute("ALTER TABLE rows ADD COLUMN tier TEXT")
+        self._conn.commit()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ----- このジョブの記録を消して最初からやり直す -----
+    def reset(self):
+        self._pending.clear()
+        self._conn.execute("DELETE FROM rows WHERE job = ?", (self.job_id,))
+        self._conn.commit()
+
+    def completed_rows(self) -> set:
+        placeholders = ", ".join("?" for _ in COMPLETED_STATES)
+        cursor = self._conn.execute(
+            f"SELECT idx FROM rows WHERE job = ? AND state IN ({placeholders})", (self.job_id, *COMPLETED_STATES)
+        )
+        return {idx for (idx,) in cursor}
+
+    # ----- 登録に失敗したが、ページ自体は作成済み（本文が途中まで）の行：行番号 → ページID -----
+    # 再開後にスクレイピングまで進んで中断した行（PENDING に戻っている）も含める。
+    def partial_pages(self) -> dict:
+        self.flush()
+        cursor = self._conn.execute(
+            "SELECT idx, page_id FROM rows WHERE job = ? AND state IN (?, ?) AND page_id IS NOT NULL",
+            (self.job_id, FAILED, PENDING),
+        )
+        return dict(cursor.fetchall())
+
+    def summary(self) -> dict:
+        self.flush()
+        cursor = self._conn.execute("SELECT state, COUNT(*) FROM rows WHERE job = ? GROUP BY state", (self.job_id,))
+        return dict(cursor.fetchall())
+
+    def record(self, idx: int, state: str, url=None, scrape_status=None, page_id=None, error=None, tier=None):
+        previous = self._pending.get(idx, {})
+        self._pending[idx] = {
+            "url": url if url is not None else previous.get("url"),
+            "state": state,
+            "scrape_status": str(scrape_status) if scrape_status is not None else previous.get("scrape_status"),
+            "tier": tier if tier is not None else previous.get("tier"),
+            "page_id": page_id if page_id is not None else previous.get("page_id"),
+            "error": str(error)[:500] if error is not None else None,
+            "updated": time.time(),
+        }
+        if len(self._pending) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def mark_scraped(self, idx: int, url, scrape_status, tier=None):
+        self.record(idx, PENDING, url=url, scrape_status=scrape_status, tier=tier)
+
+    def mark_skipped(self, idx: int, url, scrape_status, tier=None):
+        self.record(idx, SKIPPED, url=url, scrape_status=scrape_status, tier=tier)
+
+    # 作成したページの記録が失われると再開時に同じページを作り直してしまうため、すぐに書き込む
+    def mark_done(self, idx: int, page_id: str):
+        self.record(idx, DONE, page_id=page_id)
+        self.flush()
+
+    # page_id は作成まではできたページ（再開時に片付ける）。失われないよう、すぐに書き込む
+    def mark_failed(self, idx: int, error, page_id: str = None):
+        self.record(idx, FAILED, error=error, page_id=page_id)
+        if page_id:
+            self.flush()
+
+    # 前回途中まで作成したページをアーカイブした後に、その記録を消す（再開のたびにアーカイブし直さないように）
+    def clear_page_id(self, idx: int):
+        self.flush()
+        self._conn.execute("UPDATE rows SET page_id = NULL WHERE job = ? AND idx = ?", (self.job_id, idx))
+        self._conn.commit()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        entries, self._pending = self._pending, {}
+        # 既存の値は、今回の記録で指定されなかった列だけ引き継ぐ
+        self._conn.executemany(
+            """
+            INSERT INTO rows (job, idx, url, state, scrape_status, tier, page_id, error, updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (job, idx) DO UPDATE SET
+                url           = COALESCE(excluded.url, rows.url),
+                state         = excluded.state,
+                scrape_status = COALESCE(excluded.scrape_status, rows.scrape_status),
+                tier          = COALESCE(excluded.tier, rows.tier),
+                page_id       = COALESCE(excluded.page_id, rows.page_id),
+                error         = excluded.error,
+                updated       = excluded.updated
+            """,
+            [
+                (self.job_id, idx, e["url"], e["state"], e["scrape_status"], e["tier"], e["page_id"], e["error"], e["updated"])
+                for idx, e in entries.items()
+            ],
+        )
+        self._conn.commit()
@@ -0,0 +1,124 @@
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+LOGGER_NAME = "pocket2notion"
+DEFAULT_METRICS_PATH = ".import_metrics.jsonl"
+
+# 1行あたりの処理段階（この順に集計を表示する）
+STAGES = ("cache", "navigate", "wait", "extract", "build_properties", "split", "notion_create", "total")
+STAGE_LABELS = {
+    "cache": "キャッシュ参照",
+    "navigate": "ページ取得",
+    "wait": "描画待ち",
+    "extract": "本文抽出",
+    "build_properties": "プロパティ作成",
+    "split": "ブロック分割",
+    "notion_create": "Notion登録",
+    "total": "合計",
+}
+
+
+# ----- モジュールごとのロガー（pocket2notion.<name>） -----
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+# ----- ログの出力先とレベルを設定する（何度呼んでもハンドラは1つ） -----
+def setup_logging(level="INFO", stream=None) -> logging.Logger:
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if getattr(handler, "_pocket2notion", False):
+            logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler._pocket2notion = True
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S"))
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    return logger
+
+
+# ----- with ブロックの経過時間を timings[stage] に加算する -----
+@contextmanager
+def timed(timings: dict, stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+# ----- ジェネレータから要素を取り出すのにかかった時間を timings[stage] に加算しながら要素を返す -----
+# 遅延生成されるブロックの分割時間を、送信時間と分けて測るために使う。
+def timed_iter(iterable, timings: dict, stage: str):
+    iterator = iter(iterable)
+    while True:
+        with timed(timings, stage):
+            try:
+                value = next(iterator)
+            except StopIteration:
+                return
+        yield value
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+# ----- 行ごとの処理時間を集計し、1行1件のJSON（JSONL）として書き出す -----
+# record_row() で渡した timings（段階 → 秒）を段階ごとに集め、summary() で p50/p95 を返す。
+# path が None ならファイルには書かず、集計だけ行う。
+class RunMetrics:
+    def __init__(self, job_id: str = None, path: str = DEFAULT_METRICS_PATH):
+        self.job_id = job_id
+        self.path = path
+        self._durations = {}
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def record_row(self, idx: int, result: str, timings: dict, **fields):
+        for stage, seconds in timings.items():
+            self._durations.setdefault(stage, []).append(seconds)
+        if self._file is not None:
+            record = {
+                "time": round(time.time(), 3),
+                "job": self.job_id,
+                "idx": idx,
+                "result": result,
+                "timings": {stage: round(seconds, 4) for stage, seconds in timings.items()},
+                **fields,
+            }
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    # ----- 段階ごとの件数・p50・p95・合計秒数 -----
+    def summary(self) -> dict:
+        order = [stage for stage in STAGES if stage in self._durations]
+        order += sorted(stage for stage in self._durations if stage not in STAGES)
+        summary = {}
+        for stage in order:
+            values = sorted(self._durations[stage])
+            summary[stage] = {
+                "count": len(values),
+                "p50": round(percentile(values, 0.5), 4),
+                "p95": round(percentile(values, 0.95), 4),
+                "total": round(sum(values), 3),
+            }
+        return summary
@@ -0,0 +1,144 @@
+import re
+
+MAX_RICH_TEXT_LEN = 2000     # rich_text 1要素あたりの上限（Notion と同じく UTF-16 のコード単位で数える）
+MAX_RICH_TEXT_ITEMS = 100    # 1ブロックあたりの rich_text 要素数の上限
+HEADING_RE = re.compile(r"^(#{1,3}) (.+)$")
+BULLET_RE = re.compile(r"^- (.+)$")
+NUMBERED_RE = re.compile(r"^\d+\. (.+)$")
+QUOTE_RE = re.compile(r"^> (.+)$")
+CODE_FENCE = "```"
+# 長いテキストを切るときに優先する区切り（上から順に、見つかったものの中で最も後ろの位置で切る）
+BOUNDARIES = (
+    ("\n\n",),  # 段落
+    ("\n",),  # 改行
+    ("。", "！", "？", ". ", "! ", "? "),  # 文末
+    (" ", "\t", "、", "，"),  # 語・読点
+)
+
+
+# ----- テキストの長さを Notion と同じ数え方（UTF-16 のコード単位）で返す -----
+# 絵文字など BMP 外の文字は2単位になる（CJKは1単位）。ASCIIだけのテキストはそのまま len を使う。
+def utf16_len(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    return len(text.encode("utf-16-le")) // 2
+
+
+# ----- テキストを limit（UTF-16 のコード単位）以内の断片に分けるジェネレータ -----
+# 断片をつなげると元のテキストに戻る。切れ目は、上限の後ろ半分にある段落の区切り（空行）・改行・
+# 文末（。！？ や ". "）・空白の順に探し、どれも無い場合だけ上限の位置で切る。
+def iter_text_chunks(text: str, limit: int = MAX_RICH_TEXT_LEN):
+    text_len = len(text)
+    ascii_only = text.isascii()
+    pos = 0
+    while pos < text_len:
+        end = min(text_len, pos + limit)
+        if not ascii_only:
+            # 絵文字などの2単位の文字で上限を超えた分を削る（1文字で1〜2単位減るので、半分ずつ詰める）
+            units = utf16_len(text[pos:end])
+            while units > limit:
+                cut = end - (units - limit + 1) // 2
+                units -= utf16_len(text[cut:end])
+                end = cut
+        if end < text_len:
+            end = _boundary(text, pos, end)
+        yield text[pos:end]
+        pos = end
+
+
+def _boundary(text: str, start: int, end: int) -> int:
+    low = start + (end - start) // 2
+    for separators in BOUNDARIES:
+        cut = max(text.rfind(sep, low, end) + len(sep) for sep in separators)
+        if cut > low:
+            return cut
+    return end
+
+
+# ----- 本文を段落ブロックに分けるジェネレータ -----
+# 各ブロックは iter_text_chunks で段落・文の区切りで切った断片（前後の空白は除き、空の断片は飛ばす）。
+def split_text_to_paragraph_blocks(text: str, limit: int = MAX_RICH_TEXT_LEN):
+    if not text:
+        return
+    for chunk in iter_text_chunks(text, limit):
+        chunk = chunk.strip()
+        if chunk:
+            yield {
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {"rich_text": [{"type": "text", "text": {"content": chunk}}]},
+            }
+
+
+# ----- テキストを rich_text 要素（1要素 MAX_RICH_TEXT_LEN 単位まで）のリストにする -----
+def _rich_text(text: str) -> list:
+    return [{"type": "text", "text": {"content": chunk}} for chunk in iter_text_chunks(text)]
+
+
+def _text_blocks(block_type: str, text: str, **extra):
+    # rich_text の要素数が上限を超える長さなら、同じ種類のブロックに分ける
+    rich_text = _rich_text(text)
+    for pos in range(0, len(rich_text), MAX_RICH_TEXT_ITEMS):
+        yield {
+            "object": "block",
+            "type": block_type,
+            block_type: {"rich_text": rich_text[pos:pos + MAX_RICH_TEXT_ITEMS], **extra},
+        }
+
+
+# ----- text.split("\n") と同じ行を、行のリストを作らずに1行ずつ返す -----
+def _iter_lines(text: str):
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+# ----- extractor のマークアップ（またはプレーンテキスト）を Notion ブロックに変換するジェネレータ -----
+# 見出し・箇条書き・番号付きリスト・引用・コードはそれぞれのブロックに、
+# 続けて現れる段落の行はまとめて split_text_to_paragraph_blocks で段落ブロックにする。
+def text_to_blocks(text: str):
+    if not text or not text.strip():
+        return
+    paragraph = []
+    lines = _iter_lines(text)
+    for line in lines:
+        if line == CODE_FENCE:
+            yield from _flush_paragraph(paragraph)
+            code = []
+            for code_line in lines:
+                if code_line == CODE_FENCE:
+                    break
+                code.append(code_line)
+            yield from _text_blocks("code", "\n".join(code), language="plain text")
+            continue
+        if line.startswith("\\"):
+            paragraph.append(line[1:])
+            continue
+
+        heading = HEADING_RE.match(line)
+        if heading:
+            block = ("heading_%d" % len(heading.group(1)), heading.group(2))
+        elif BULLET_RE.match(line):
+            block = ("bulleted_list_item", line[2:])
+        elif NUMBERED_RE.match(line):
+            block = ("numbered_list_item", NUMBERED_RE.match(line).group(1))
+        elif QUOTE_RE.match(line):
+            block = ("quote", line[2:])
+        else:
+            paragraph.append(line)
+            continue
+        yield from _flush_paragraph(paragraph)
+        yield from _text_blocks(*block)
+    yield from _flush_paragraph(paragraph)
+
+
+def _flush_paragraph(paragraph: list):
+    if paragraph:
+        text = "\n".join(paragraph)
+        paragraph.clear()
+        yield from split_text_to_paragraph_blocks(text)
@@ -0,0 +1,287 @@
+import asyncio
+import json
+import random
+import time
+import httpx
+from notion_client import AsyncClient
+from notion_client.errors import APIErrorCode, APIResponseError, HTTPResponseError, RequestTimeoutError
+from metrics import get_logger
+
+logger = get_logger("notion_writer")
+
+NOTION_REQUESTS_PER_SECOND = 3.0  # Notion API の1インテグレーションあたりの平均レート上限
+RETRYABLE_STATUSES = {409, 429, 500, 502, 503, 504}
+# 処理される前に断られたことが分かるステータス。作成・追記（同じリクエストを送り直すと二重になる）はこれだけをリトライする
+REJECTED_STATUSES = {409, 429, 503}
+MAX_CHILDREN_PER_REQUEST = 100    # pages.create / blocks.children.append で1回に送れるブロック数の上限
+MAX_REQUEST_BYTES = 450 * 1000    # 1リクエストのJSONの大きさの目安（Notion の上限 500KB に余裕を持たせる）
+QUERY_PAGE_SIZE = 100             # databases.query で1回に取得できるページ数の上限
+
+
+# ----- トークンバケット：平均 rate 回/秒、最大 capacity 回までのバーストを許す -----
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float):
+        self._refill(time.monotonic())
+        self.rate = float(rate)
+
+    # ----- Retry-After などで一時停止している最中か -----
+    def is_paused(self) -> bool:
+        return time.monotonic() < self._paused_until
+
+    # ----- Retry-After などで全リクエストを一時停止する -----
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self):
+        self.waiting += 1
+        try:
+            async with self._lock:  # 待っている呼び出し元には到着順にトークンを渡す
+                while True:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        await asyncio.sleep(self._paused_until - now)
+                        continue
+                    self._refill(now)
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return
+                    await asyncio.sleep((1.0 - self._tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+
+# ----- リトライ対象のエラーなら待機秒数（Retry-Afterがあればその値）を返す -----
+# idempotent=False（ページ作成・ブロック追記）の場合、タイムアウトや 500/502/504 はNotion側で
+# 処理済みかもしれない（送り直すとページやブロックが二重にできる）ので、リトライしない。
+def _retry_after(error, idempotent: bool = True):
+    if isinstance(error, RequestTimeoutError):
+        return 0.0 if idempotent else None
+    if isinstance(error, HTTPResponseError):
+        if error.status not in (RETRYABLE_STATUSES if idempotent else REJECTED_STATUSES):
+            return None
+        header = error.headers.get("retry-after") if error.headers is not None else None
+        try:
+            return max(0.0, float(header)) if header else 0.0
+        except ValueError:
+            return 0.0
+    return None
+
+
+# ----- JSONにしたときのバイト数（httpx と同じく ensure_ascii=False の UTF-8） -----
+def _json_size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+# ----- ブロックを、件数（100件）と JSON の大きさ（max_bytes）の両方の上限に収まるまとまりに分ける -----
+# 日本語の段落ブロックは1件で最大 6KB 程度になるので、100件だと 500KB を超えることがある。
+# 最初のまとまりはプロパティと一緒に送るので、first_reserved バイトを差し引く。
+def iter_block_batches(blocks, max_bytes: int = MAX_REQUEST_BYTES, first_reserved: int = 0):
+    batch = []
+    size = 0
+    budget = max_bytes - first_reserved
+    for block in blocks:
+        block_size = _json_size(block) + 1
+        if batch and (len(batch) >= MAX_CHILDREN_PER_REQUEST or size + block_size > budget):
+            yield batch
+            batch = []
+            size = 0
+            budget = max_bytes
+        batch.append(block)
+        size += block_size
+    if batch:
+        yield batch
+
+
+# ----- ページは作成できたが、本文ブロックの追記に失敗した -----
+# page_id は作成済みのページ、blocks_sent はそれまでに送信できたブロック数。
+# 再開時に途中までのページを片付けられるよう、呼び出し側でジャーナルに page_id を記録する。
+class PartialPageError(Exception):
+    def __init__(self, page_id: str, blocks_sent: int, error: Exception):
+        super().__init__(f"ページ作成後、本文の追記に失敗しました（{blocks_sent} ブロック送信済み）: {error}")
+        self.page_id = page_id
+        self.blocks_sent = blocks_sent
+        self.error = error
+
+
+# ----- 同期クライアントと同じ認証・接続先で、keep-alive の接続プールを持つ非同期クライアントを作る -----
+def open_async_client(notion, max_connections: int = 8) -> AsyncClient:
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return AsyncClient(options=notion.options, client=httpx.AsyncClient(limits=limits))
+
+
+# ----- Notion への書き込みをまとめて管理するレイヤ -----
+# すべてのリクエストをトークンバケットで rate 回/秒 に均し、429/5xx は Retry-After を守った上で
+# 指数バックオフ（ジッター付き）でリトライする。429 を受けたらレートを半分に落とし（同時に送信中だった
+# リクエストがまとめて429になっても、一時停止の間に下げるのは1回だけ）、成功が続くと少しずつ元のレートへ戻す。
+# ページ作成・ブロック追記は、処理前に断られたことが分かるエラー（409/429/503）だけをリトライする。
+# async with の間は同期クライアントの代わりに非同期クライアント（接続プールを共有）でリクエストを送るので、
+# スレッドを使わずに複数のページ作成・追記を同時に送信できる。
+class NotionWriter:
+    def __init__(self, notion, database_id: str, rate: float = NOTION_REQUESTS_PER_SECOND,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 max_connections: int = 8):
+        self.notion = notion
+        self.max_connections = max_connections
+        self._sync_notion = None  # async with の間、元の同期クライアントを退避しておく
+        self.database_id = database_id
+        self.max_rate = float(rate)
+        self.min_rate = min(0.2, self.max_rate)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(rate)
+        self.in_flight = 0     # 送信中のリクエスト数
+        self._backing_off = 0  # リトライ待ちのリクエスト数
+        self.retry_count = 0
+        self.rate_limited_count = 0
+        self.blocks_written = 0
+        self.append_seconds = 0.0
+
+    async def __aenter__(self):
+        if not isinstance(self.notion, AsyncClient):
+            self._sync_notion = self.notion
+            self.notion = open_async_client(self.notion, self.max_connections)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._sync_notion is not None:
+            await self.notion.aclose()
+            self.notion = self._sync_notion
+            self._sync_notion = None
+
+    @property
+    def current_rate(self) -> float:
+        return self.bucket.rate
+
+    # ----- トークン待ち・リトライ待ちで、まだ送信できていないリクエスト数 -----
+    @property
+    def queue_depth(self) -> int:
+        return self.bucket.waiting + self._backing_off
+
+    def _backoff(self, attempt: int, retry_after: float) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return max(retry_after, delay)
+
+    def _on_rate_limited(self):
+        self.rate_limited_count += 1
+        if self.bucket.is_paused():
+            return  # 同じバーストで送ったリクエストの429。レートは最初の1件で下げてある
+        self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+        logger.warning("Rate limited by Notion, lowering rate to %.2f req/s", self.bucket.rate)
+
+    def _on_success(self):
+        if self.bucket.rate < self.max_rate:
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + 0.1))
+
+    # ----- クライアントのメソッドを呼び、レート制御とリトライを行う -----
+    # 非同期クライアントならそのまま await し、同期クライアントなら別スレッドで呼ぶ。
+    # idempotent=False のリクエストは、処理前に断られた場合だけリトライする（_retry_after を参照）。
+    async def _request(self, method, idempotent: bool = True, **kwargs):
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            self.in_flight += 1
+            try:
+                if isinstance(self.notion, AsyncClient):
+                    response = await method(**kwargs)
+                else:
+                    response = await asyncio.to_thread(method, **kwargs)
+            except Exception as e:
+                error = e
+            else:
+                self._on_success()
+                return response
+            finally:
+                self.in_flight -= 1
+
+            retry_after = _retry_after(error, idempotent)
+            if retry_after is None or attempt >= self.max_retries:
+                raise error
+            delay = self._backoff(attempt, retry_after)
+            attempt += 1
+            self.retry_count += 1
+            logger.info("%s (%s), retry %d/%d in %.1fs", type(error).__name__, getattr(error, "status", "-"), attempt, self.max_retries, delay)
+            if isinstance(error, HTTPResponseError) and error.status == 429:
+                # レート制限は全リクエストに効くので、バケットごと止める
+                self._on_rate_limited()
+                self.bucket.pause(delay)
+                continue
+            self._backing_off += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._backing_off -= 1
+
+    # ----- データベースのページを databases.query で100件ずつ取得して1件ずつ返す非同期ジェネレータ -----
+    # query には filter / sorts / filter_properties などをそのまま渡す。
+    async def iter_database_pages(self, **query):
+        cursor = None
+        while True:
+            kwargs = dict(query, page_size=QUERY_PAGE_SIZE)
+            if cursor:
+                kwargs["start_cursor"] = cursor
+            response = await self._request(self.notion.databases.query, database_id=self.database_id, **kwargs)
+            for page in response.get("results", []):
+                yield page
+            cursor = response.get("next_cursor")
+            if not response.get("has_more") or not cursor:
+                break
+
+    # ----- ページをアーカイブする（前回途中まで書き込んだページの片付け。既に無いページは無視する） -----
+    async def archive_page(self, page_id: str):
+        try:
+            await self._request(self.notion.pages.update, page_id=page_id, archived=True)
+        except APIResponseError as e:
+            if e.code != APIErrorCode.ObjectNotFound:
+                raise
+            logger.debug("Page %s no longer exists, nothing to archive", page_id)
+
+    # ----- ページを作成し、本文ブロックを100件ずつ送る -----
+    # 最初の100件は pages.create に含め、残りは blocks.children.append で100件ずつ追記する
+    # （JSONが MAX_REQUEST_BYTES を超える場合は、100件未満でも分けて送る）。
+    # children はリストでもジェネレータでもよい（必要な分だけ取り出す）。
+    # 戻り値は作成したページと、ブロック数・追記回数・追記にかかった秒数。
+    # 追記に失敗した場合は、作成済みのページIDを持つ PartialPageError を送出する。
+    async def create_page(self, property_json: dict, children_blocks) -> dict:
+        batches = iter_block_batches(children_blocks or [], first_reserved=_json_size(property_json))
+        first_batch = next(batches, [])
+        page = await self._request(
+            self.notion.pages.create,
+            idempotent=False,
+            parent={"database_id": self.database_id},
+            properties=property_json,
+            children=first_batch,
+        )
+        report = {"page": page, "blocks": len(first_batch), "append_requests": 0, "append_seconds": 0.0}
+
+        started = time.monotonic()
+        while True:
+            try:
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                await self._request(self.notion.blocks.children.append, idempotent=False, block_id=page["id"], children=batch)
+            except Exception as e:
+                self.blocks_written += report["blocks"]
+                raise PartialPageError(page["id"], report["blocks"], e) from e
+            report["blocks"] += len(batch)
+            report["append_requests"] += 1
+        if report["append_requests"]:
+            report["append_seconds"] = time.monotonic() - started
+            self.append_seconds += report["append_seconds"]
+        self.blocks_written += report["blocks"]
+        return report
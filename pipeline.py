@@ -0,0 +1,114 @@
+import asyncio
+from scheduler import DomainScheduler
+from metrics import get_logger
+
+logger = get_logger("pipeline")
+
+SUCCESS = "success"
+FAILURE = "failure"
+SKIPPED = "skipped"
+
+# ----- インポート全体の進捗カウンタ -----
+class PipelineStats:
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.processed = 0
+        self.success = 0
+        self.failure = 0
+        self.skipped = 0
+
+    def record(self, outcome: str):
+        self.processed += 1
+        if outcome == SUCCESS:
+            self.success += 1
+        elif outcome == SKIPPED:
+            self.skipped += 1
+        else:
+            self.failure += 1
+
+    @property
+    def progress(self) -> float:
+        if not self.total:
+            return 0.0
+        return min(self.processed / self.total, 1.0)
+
+
+# ----- スクレイピング → Notion登録 の非同期パイプライン -----
+# rows は (idx, row) の iterable。concurrency 本のワーカーが rows から順に取り出して
+# scrape(idx, row) を並行実行し、終わったものから順に upload(idx, row, item) に流す。
+# scrape が {"skip": True} を返した行は upload せずスキップとして数える。
+# upload は SUCCESS / FAILURE / SKIPPED のいずれかを返し、upload_concurrency 本のワーカーで並行実行する。
+# url_of(idx, row) を渡すと DomainScheduler を通して行を払い出し、ドメインごとの
+# 同時接続数（per_domain_concurrency）とアクセス頻度（per_domain_rate 回/秒）を守る。
+async def run_pipeline(rows, scrape, upload, concurrency: int = 4, total: int = 0, on_progress=None,
+                       upload_concurrency: int = 1, url_of=None, per_domain_concurrency: int = 2, per_domain_rate: float = 1.0):
+    concurrency = max(1, int(concurrency))
+    upload_concurrency = max(1, int(upload_concurrency))
+    stats = PipelineStats(total)
+    # スクレイピングがアップロードより大きく先行しないよう、キューの長さを制限する
+    results = asyncio.Queue(maxsize=concurrency * 2)
+    row_iter = iter(rows)
+    scheduler = None
+    if url_of is not None:
+        scheduler = DomainScheduler(
+            row_iter,
+            key=lambda entry: url_of(*entry),
+            per_domain_concurrency=per_domain_concurrency,
+            per_domain_rate=per_domain_rate,
+        )
+
+    def record(outcome: str):
+        stats.record(outcome)
+        if on_progress:
+            on_progress(stats)
+
+    async def next_row():
+        if scheduler is None:
+            return None, next(row_iter, None)
+        scheduled = await scheduler.next()
+        return scheduled if scheduled is not None else (None, None)
+
+    async def scrape_worker():
+        while True:
+            host, entry = await next_row()
+            if entry is None:
+                break
+            idx, row = entry
+            try:
+                item = await scrape(idx, row)
+            except Exception as e:
+                logger.exception("Row %s: scrape stage failed: %s", idx, e)
+                record(FAILURE)
+                continue
+            finally:
+                if scheduler is not None:
+                    await scheduler.release(host)
+            if item is None or item.get("skip"):
+                record(SKIPPED)
+                continue
+            await results.put((idx, row, item))
+
+    async def upload_worker():
+        while True:
+            entry = await results.get()
+            if entry is None:
+                break
+            idx, row, item = entry
+            try:
+                outcome = await upload(idx, row, item)
+            except Exception as e:
+                logger.exception("Row %s: upload stage failed: %s", idx, e)
+                outcome = FAILURE
+            record(outcome)
+
+    uploaders = [asyncio.create_task(upload_worker()) for _ in range(upload_concurrency)]
+    try:
+        await asyncio.gather(*(scrape_worker() for _ in range(concurrency)))
+        for _ in uploaders:
+            await results.put(None)
+        await asyncio.gather(*uploaders)
+    finally:
+        for uploader in uploaders:
+            if not uploader.done():
+                uploader.cancel()
+    return stats
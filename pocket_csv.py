@@ -0,0 +1,88 @@
+import csv
+import io
+from contextlib import contextmanager
+
+CHUNK_SIZE = 1024 * 1024
+
+
+# ----- Pocket のCSVの1行（必要な列だけを型をそろえて保持する） -----
+class PocketRow:
+    __slots__ = ("title", "url", "time_added", "tags", "status")
+
+    def __init__(self, title: str, url: str, time_added, tags: str, status: str):
+        self.title = title
+        self.url = url
+        self.time_added = time_added  # Unixタイムスタンプ（int）。空や不正な値は元の文字列/None
+        self.tags = tags
+        self.status = status
+
+    @classmethod
+    def from_record(cls, record: dict):
+        time_added = (record.get("time_added") or "").strip()
+        if time_added:
+            try:
+                time_added = int(time_added)
+            except ValueError:
+                pass  # 変換できない値はそのまま渡し、登録時に警告を出す
+        else:
+            time_added = None
+        return cls(
+            title=record.get("title") or "",
+            url=(record.get("url") or "").strip() or None,
+            time_added=time_added,
+            tags=record.get("tags") or "",
+            status=record.get("status") or "",
+        )
+
+    def __repr__(self):
+        return f"PocketRow(title={self.title!r}, url={self.url!r})"
+
+
+# ----- パスでもアップロードされたファイル（バイナリのファイルオブジェクト）でも、先頭から読むバイナリストリームを返す -----
+@contextmanager
+def _open_binary(source):
+    if isinstance(source, str) or hasattr(source, "__fspath__"):
+        with open(source, "rb") as f:
+            yield f
+    elif isinstance(source, bytes):
+        yield io.BytesIO(source)
+    else:
+        source.seek(0)
+        try:
+            yield source
+        finally:
+            source.seek(0)
+
+
+@contextmanager
+def _open_text(source):
+    with _open_binary(source) as binary:
+        text = io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+        try:
+            yield text
+        finally:
+            text.detach()  # 呼び出し元のファイルオブジェクトは閉じない
+
+
+# ----- CSVを1行ずつ読み、(行番号, PocketRow) を返すジェネレータ（全体をメモリに載せない） -----
+def iter_pocket_rows(source, start: int = 1):
+    with _open_text(source) as text:
+        for idx, record in enumerate(csv.DictReader(text), start=start):
+            yield idx, PocketRow.from_record(record)
+
+
+# ----- 行数（ヘッダー除く）を改行の数から高速に数える -----
+# CSVとしては解析しないので、値の中に改行を含む行があると実際の行数より多くなる（進捗表示用の目安）。
+def count_rows(source) -> int:
+    lines = 0
+    last = b"\n"
+    with _open_binary(source) as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        lines += 1  # 末尾に改行の無い最終行
+    return max(0, lines - 1)
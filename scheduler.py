@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+
+# ----- URLからホスト名を取り出す（スケジューリングの単位） -----
+def host_of(url) -> str:
+    if not isinstance(url, str):
+        return ""
+    try:
+        host = urlsplit(url.strip()).hostname or ""
+    except ValueError:
+        return ""
+    host = host.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class _HostState:
+    def __init__(self):
+        self.queue = deque()
+        self.active = 0
+        self.next_allowed = 0.0
+        self.scheduled = False  # ラウンドロビン順に入っているか
+
+
+# ----- ドメインごとのキューでアクセス間隔と同時接続数を制御するスケジューラ -----
+# rows から最大 lookahead 件を先読みしてホストごとのキューに振り分け、
+# 「同時接続数が上限未満」かつ「前回のアクセスから 1/per_domain_rate 秒以上経過」したホストを
+# ラウンドロビンで選んで行を払い出す。同じサイトが続くCSVでも、他のドメインを先に進められる。
+# URLが無効な行（ホスト名なし）は制限なしで払い出す。
+class DomainScheduler:
+    def __init__(self, rows, key, per_domain_concurrency: int = 2, per_domain_rate: float = 1.0, lookahead: int = 1000):
+        self._rows = iter(rows)
+        self._key = key
+        self.per_domain_concurrency = max(1, int(per_domain_concurrency))
+        self.interval = 1.0 / per_domain_rate if per_domain_rate and per_domain_rate > 0 else 0.0
+        self.lookahead = max(1, int(lookahead))
+        self._hosts = {}
+        self._order = deque()  # ラウンドロビン順のホスト名
+        self._buffered = 0
+        self._exhausted = False
+        self._cond = asyncio.Condition()
+
+    @property
+    def buffered(self) -> int:
+        return self._buffered
+
+    @property
+    def host_count(self) -> int:
+        return len(self._hosts)
+
+    def _fill(self):
+        while not self._exhausted and self._buffered < self.lookahead:
+            try:
+                entry = next(self._rows)
+            except StopIteration:
+                self._exhausted = True
+                break
+            host = host_of(self._key(entry))
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState()
+            if not state.scheduled:
+                state.scheduled = True
+                self._order.append(host)
+            state.queue.append(entry)
+            self._buffered += 1
+
+    def _pick(self, now: float):
+        # 払い出せるホストをラウンドロビンで探す。無ければ次に空くまでの秒数を返す
+        wait = None
+        for _ in range(len(self._order)):
+            host = self._order[0]
+            self._order.rotate(-1)
+            state = self._hosts[host]
+            if not state.queue:
+                continue
+            if host == "":
+                return host, None
+            if state.active >= self.per_domain_concurrency:
+                continue
+            if now < state.next_allowed:
+                remaining = state.next_allowed - now
+                wait = remaining if wait is None else min(wait, remaining)
+                continue
+            return host, None
+        return None, wait
+
+    # ----- 次に処理してよい (host, entry) を返す。全件払い出し済みなら None -----
+    async def next(self):
+        async with self._cond:
+            while True:
+                self._fill()
+                if self._buffered == 0 and self._exhausted:
+                    return None
+                host, wait = self._pick(time.monotonic())
+                if host is not None:
+                    state = self._hosts[host]
+                    entry = state.queue.popleft()
+                    self._buffered -= 1
+                    state.active += 1
+                    state.next_allowed = time.monotonic() + self.interval
+                    return host, entry
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    # ----- 処理が終わったら呼ぶ（同時接続数の枠を返す） -----
+    async def release(self, host: str):
+        async with self._cond:
+            state = self._hosts.get(host)
+            if state is not None:
+                state.active -= 1
+                # 待ち行が無くなったホストはラウンドロビンから外す（アクセス間隔の記録は残す）
+                if state.active == 0 and not state.queue and state.scheduled:
+                    state.scheduled = False
+                    self._order.remove(host)
+            self._cond.notify_all()
@@ -0,0 +1,112 @@
+import json
+import sqlite3
+import time
+from urls import normalize_url
+
+DEFAULT_CACHE_PATH = ".scrape_cache.sqlite3"
+
+
+# ----- fetch_page_info の結果（ステータス/タイトル/本文）をURLごとに保存するSQLiteキャッシュ -----
+# キーは normalize_url で正規化したURL。ttl_seconds を過ぎたエントリは使わず、
+# 合計サイズが max_bytes を超えたら最後に参照された時刻が古いものから削除する（LRU）。
+class ScrapeCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = 7 * 24 * 3600, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                key      TEXT PRIMARY KEY,
+                status   TEXT,
+                title    TEXT,
+                body     TEXT,
+                size     INTEGER NOT NULL,
+                created  REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed)")
+        self._conn.commit()
+        self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _is_fresh(self, created: float, now: float) -> bool:
+        return not self.ttl_seconds or now - created <= self.ttl_seconds
+
+    # ----- 有効なエントリがあるか（カウンタや参照時刻は更新しない） -----
+    def contains(self, url: str) -> bool:
+        row = self._conn.execute("SELECT created FROM pages WHERE key = ?", (normalize_url(url),)).fetchone()
+        return row is not None and self._is_fresh(row[0], time.time())
+
+    def get(self, url: str):
+        key = normalize_url(url)
+        now = time.time()
+        row = self._conn.execute("SELECT status, title, body, created FROM pages WHERE key = ?", (key,)).fetchone()
+        if row is None or not self._is_fresh(row[3], now):
+            self.misses += 1
+            return None
+        self._conn.execute("UPDATE pages SET accessed = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        self.hits += 1
+        return {"status": json.loads(row[0]), "title": row[1], "body": row[2]}
+
+    # ----- 取得結果を保存する。ナビゲーションエラーや429/5xxなど一時的な失敗は保存しない -----
+    def put(self, url: str, result: dict) -> bool:
+        status = result.get("status")
+        if not isinstance(status, int) or status == 429 or status >= 500:
+            return False
+        key = normalize_url(url)
+        title = result.get("title") or ""
+        body = result.get("body") or ""
+        size = len(title.encode("utf-8")) + len(body.encode("utf-8"))
+        now = time.time()
+        old = self._conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pages (key, status, title, body, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, json.dumps(status), title, body, size, now, now),
+        )
+        self.total_bytes += size - (old[0] if old else 0)
+        self._evict()
+        self._conn.commit()
+        return True
+
+    def _evict(self):
+        if not self.max_bytes or self.total_bytes <= self.max_bytes:
+            return
+        # 期限切れを先に消し、それでも超えていれば参照の古い順に消す
+        if self.ttl_seconds:
+            cutoff = time.time() - self.ttl_seconds
+            expired = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages WHERE created < ?", (cutoff,)).fetchone()[0]
+            if expired:
+                self._conn.execute("DELETE FROM pages WHERE created < ?", (cutoff,))
+                self.total_bytes -= expired
+        victims = []
+        excess = self.total_bytes - self.max_bytes
+        if excess > 0:
+            for key, size in self._conn.execute("SELECT key, size FROM pages ORDER BY accessed"):
+                victims.append(key)
+                excess -= size
+                if excess <= 0:
+                    break
+            self._conn.executemany("DELETE FROM pages WHERE key = ?", [(key,) for key in victims])
+            self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
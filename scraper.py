@@ -0,0 +1,444 @@
+import asyncio
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+import httpx
+from playwright.async_api import async_playwright
+from extractor import extract_title_and_body, escape_plain_text, truncate_body, DEFAULT_MAX_BODY_CHARS
+from metrics import get_logger, timed
+
+logger = get_logger("scraper")
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/113.0.0.0 Safari/537.36"
+)
+
+TIER_HTTP = "http"        # 通常のHTTPリクエストで取得
+TIER_BROWSER = "browser"  # Playwright（Chromium）で取得
+TIER_CACHE = "cache"      # スクレイピングキャッシュから取得
+
+ESCALATE_STATUSES = {403, 429, 503}  # ボット対策で弾かれている可能性があるステータス
+MAX_HTML_BYTES = 5 * 1024 * 1024  # これより大きいHTMLは先頭だけを解析する（ブラウザでは innerText だけを使う）
+MAX_DOM_ELEMENTS = 100_000  # ブラウザで描画した結果の要素数がこれを超えるページも、HTMLを受け取らない
+HTML_TRUNCATION_MARKER = "（ページが大きいため、先頭の {mb:.3g}MB の範囲だけを取り込みました）"
+
+READY_QUIET_MS = 500      # 本文の長さがこの時間変わらなければ描画完了とみなす
+READY_TIMEOUT_MS = 8000   # 描画完了を待つ上限
+
+# ブラウザで読み込まない（本文の取得に不要な）リクエスト
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adservice.google.com", "amazon-adsystem.com",
+    "facebook.net", "connect.facebook.net", "scorecardresearch.com", "quantserve.com", "chartbeat.com",
+    "chartbeat.net", "hotjar.com", "segment.io", "segment.com", "optimizely.com", "newrelic.com",
+    "nr-data.net", "taboola.com", "outbrain.com", "criteo.com", "criteo.net", "adnxs.com",
+    "rubiconproject.com", "pubmatic.com", "moatads.com", "mixpanel.com", "clarity.ms",
+)
+
+# 本文（innerText）の長さが READY_QUIET_MS の間変わらず、DOMの変更も止まったら true を返す。
+# 広告のローテーションなどでDOMの変更が止まらないページは、本文の長さがその3倍の時間変わらなければ true。
+CONTENT_READY_JS = """
+(quietMs) => {
+    const now = performance.now();
+    let state = window.__p2nReady;
+    if (!state) {
+        state = window.__p2nReady = {length: -1, since: now, mutated: now};
+        new MutationObserver(() => { state.mutated = performance.now(); })
+            .observe(document, {childList: true, subtree: true, characterData: true});
+    }
+    const body = document.body;
+    const length = body ? (body.innerText || '').length : 0;
+    if (length !== state.length) {
+        state.length = length;
+        state.since = now;
+        return false;
+    }
+    if (document.readyState === 'loading') return false;
+    const stableFor = now - state.since;
+    if (length === 0) return document.readyState === 'complete' && stableFor >= quietMs * 3;
+    return (stableFor >= quietMs && now - state.mutated >= quietMs) || stableFor >= quietMs * 3;
+}
+"""
+
+
+def _is_blocked_host(url: str) -> bool:
+    try:
+        host = (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return False
+    return any(host == blocked or host.endswith("." + blocked) for blocked in BLOCKED_HOSTS)
+
+
+# ----- 画像・フォント・動画と広告/解析系のリクエストを中断する（ページが早く落ち着き、通信量とメモリも減る） -----
+async def _block_heavy_requests(route):
+    request = route.request
+    try:
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or _is_blocked_host(request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+    except Exception:
+        pass  # ページが閉じられた後のリクエストなど
+
+
+# ----- 本文の描画が落ち着くまで待つ（上限 timeout_ms）。落ち着いたら True -----
+async def wait_for_content_ready(page, quiet_ms: int = READY_QUIET_MS, timeout_ms: int = READY_TIMEOUT_MS) -> bool:
+    try:
+        await page.wait_for_function(CONTENT_READY_JS, arg=quiet_ms, polling=100, timeout=timeout_ms)
+        return True
+    except Exception:
+        return False
+
+
+# ----- HTMLからタイトルと本文を取り出す（プールがあれば別プロセスで、無ければこのプロセスで） -----
+async def _extract(extraction, html, from_encoding: str = None, max_body_chars: int = DEFAULT_MAX_BODY_CHARS,
+                   note: str = None) -> dict:
+    if extraction is not None:
+        return await extraction.extract(html, from_encoding, max_body_chars, note)
+    return extract_title_and_body(html, from_encoding=from_encoding, max_body_chars=max_body_chars, note=note)
+
+
+# ----- ブラウザを使わずにページを取得する、接続を使い回すHTTPクライアント -----
+# keep-alive と gzip 圧縮を使い、同じホストへの接続を再利用する。
+# fetch() は静的HTMLで足りる場合だけ結果を返し、JSで描画されるページやボット対策で
+# 弾かれた場合、通信エラーの場合は None を返す（呼び出し側でブラウザに切り替える）。
+# extraction（ExtractionPool）を渡すと、HTMLの解析は別プロセスで行う。
+# HTMLは max_bytes まで、本文は max_body_chars 文字までしか保持しない。
+class HttpFetcher:
+    def __init__(self, max_connections: int = 20, timeout: float = 15.0, max_bytes: int = MAX_HTML_BYTES, extraction=None,
+                 max_body_chars: int = DEFAULT_MAX_BODY_CHARS):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.extraction = extraction
+        self.max_body_chars = max_body_chars
+        self._client = None
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={
+                    "User-Agent": USER_AGENT,
+                    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+                },
+                follow_redirects=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # timings を渡すと、取得（navigate）と本文抽出（extract）にかかった秒数を加算する
+    # ブラウザで取得し直す必要がある場合は None を返す。静的HTMLは取れたが描画が必要そうな場合は、
+    # "escalate" を付けた結果を返す（ブラウザでの取得に失敗したときに代わりに使う）。
+    async def fetch(self, url: str, timings: dict = None):
+        timings = {} if timings is None else timings
+        result = {"status": None, "title": "No Title", "body": "", "tier": TIER_HTTP}
+        try:
+            with timed(timings, "navigate"):
+                async with self._client.stream("GET", url) as response:
+                    result["status"] = response.status_code
+                    if response.status_code in ESCALATE_STATUSES:
+                        logger.debug("%s: HTTP status %s, escalating to browser", url, response.status_code)
+                        return None
+                    if response.status_code == 404:
+                        return result
+
+                    # PDFや画像などはブラウザでも本文を取れないので、ステータスだけ返す（本体は読まない）
+                    # text/plain などのテキストは、そのまま本文にする
+                    content_type = response.headers.get("content-type", "").lower()
+                    plain_text = content_type.startswith("text/") and "html" not in content_type
+                    if content_type and "html" not in content_type and not plain_text:
+                        logger.debug("%s: non-HTML content (%s), skipping body", url, content_type)
+                        return result
+
+                    html = bytearray()
+                    truncated = False
+                    async for chunk in response.aiter_bytes():
+                        html += chunk
+                        if len(html) >= self.max_bytes:
+                            truncated = True
+                            del html[self.max_bytes:]
+                            break
+                    html = bytes(html)
+                    encoding = response.charset_encoding
+        except httpx.HTTPError as e:
+            logger.debug("%s: HTTP fetch failed (%s: %s), escalating to browser", url, type(e).__name__, e)
+            return None
+
+        # HTMLを途中までしか読んでいない場合は、本文の切り詰めの一文の代わりにそのことを書く（上限の範囲内で1回だけ切り詰める）
+        note = None
+        if truncated:
+            logger.info("%s: HTML larger than %d bytes, only the beginning was parsed", url, self.max_bytes)
+            note = HTML_TRUNCATION_MARKER.format(mb=self.max_bytes / 1024 / 1024)
+        if plain_text:
+            with timed(timings, "extract"):
+                try:
+                    text = html.decode(encoding or "utf-8", errors="replace")
+                except LookupError:  # 不明な文字コード名
+                    text = html.decode("utf-8", errors="replace")
+                text = text.replace("\r\n", "\n").strip()
+                result["body"] = truncate_body(escape_plain_text(text), self.max_body_chars, note=note)
+            return result
+        with timed(timings, "extract"):
+            parsed = await _extract(self.extraction, html, encoding, self.max_body_chars, note)
+        del html
+        result["title"] = parsed["title"] or "No Title"
+        result["body"] = parsed["body"]
+        if parsed["script_rendered"]:
+            logger.debug("%s: static HTML looks script-rendered (body length %d), escalating to browser", url, len(parsed["body"]))
+            result["escalate"] = True
+        return result
+
+
+# ----- 1つのChromiumプロセスと、そこから払い出したページ数を管理する -----
+class _BrowserSlot:
+    def __init__(self, browser):
+        self.browser = browser
+        self.served = 0      # これまでに払い出したページ数
+        self.active = 0      # 現在使用中のページ数
+        self.retired = False # 再起動対象（使用中ページが無くなったら閉じる）
+
+    def is_alive(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+
+# ----- インポート実行中ずっと使い回すブラウザプール -----
+# URLごとにブラウザを起動する代わりに、起動済みのブラウザから新しいcontext/pageを払い出す。
+# max_pages_per_browser ページを処理したブラウザ、またはクラッシュしたブラウザは作り直す。
+class BrowserPool:
+    def __init__(self, size: int = 1, max_pages_per_browser: int = 200, headless: bool = True, block_resources: bool = True):
+        self.size = max(1, int(size))
+        self.max_pages_per_browser = max(1, int(max_pages_per_browser))
+        self.headless = headless
+        self.block_resources = block_resources
+        self._playwright = None
+        self._slots = []
+        self._lock = asyncio.Lock()
+        self.launch_count = 0
+
+    async def start(self):
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+            logger.info("Browser pool started (size=%d, max_pages_per_browser=%d)", self.size, self.max_pages_per_browser)
+        return self
+
+    async def close(self):
+        async with self._lock:
+            slots, self._slots = self._slots, []
+        for slot in slots:
+            await self._close_browser(slot)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        logger.info("Browser pool closed (browsers launched: %d)", self.launch_count)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _launch(self) -> _BrowserSlot:
+        browser = await self._playwright.chromium.launch(headless=self.headless)
+        self.launch_count += 1
+        return _BrowserSlot(browser)
+
+    async def _close_browser(self, slot: _BrowserSlot):
+        try:
+            if slot.browser is not None:
+                await slot.browser.close()
+        except Exception as e:
+            logger.warning("Error closing browser: %s", e)
+        slot.browser = None
+
+    async def _acquire_slot(self) -> _BrowserSlot:
+        async with self._lock:
+            if self._playwright is None:
+                await self.start()
+
+            # クラッシュしたブラウザを取り除く
+            for slot in [s for s in self._slots if not s.is_alive()]:
+                logger.warning("Browser disconnected, replacing it")
+                self._slots.remove(slot)
+                slot.retired = True
+
+            if len(self._slots) < self.size:
+                slot = await self._launch()
+                self._slots.append(slot)
+            else:
+                slot = min(self._slots, key=lambda s: s.active)
+
+            # 上限ページ数に達したブラウザは新しいものと入れ替える
+            if slot.served >= self.max_pages_per_browser:
+                logger.info("Recycling browser after %d pages", slot.served)
+                self._slots.remove(slot)
+                slot.retired = True
+                if slot.active == 0:
+                    await self._close_browser(slot)
+                slot = await self._launch()
+                self._slots.append(slot)
+
+            slot.served += 1
+            slot.active += 1
+            return slot
+
+    async def _release_slot(self, slot: _BrowserSlot):
+        async with self._lock:
+            slot.active -= 1
+            if slot.retired and slot.active == 0:
+                await self._close_browser(slot)
+
+    # ----- 新しいcontext/pageを払い出し、使用後はcontextごと破棄する -----
+    @asynccontextmanager
+    async def page(self):
+        slot = await self._acquire_slot()
+        context = None
+        try:
+            context = await slot.browser.new_context(user_agent=USER_AGENT)
+            if self.block_resources:
+                await context.route("**/*", _block_heavy_requests)
+            page = await context.new_page()
+            yield page
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass  # ブラウザが落ちている場合は次回の払い出し時に作り直す
+            await self._release_slot(slot)
+
+
+# ----- ページ情報（ステータス/タイトル/全文）を取得する非同期関数 -----
+# http が渡されれば、まず通常のHTTPリクエストで取得し、静的HTMLで足りない場合だけ Playwright を使う。
+# 結果の "tier" に、どちらで取得したかを、"timings" に段階（navigate/wait/extract）ごとの秒数を記録する。
+# extraction（ExtractionPool）を渡すと、ブラウザで取得したHTMLの解析も別プロセスで行う。
+# 本文は max_body_chars 文字まで。HTMLが MAX_HTML_BYTES バイトか要素数が MAX_DOM_ELEMENTS を超えるページはHTMLを受け取らず、
+# ブラウザ内で切り詰めた innerText だけを受け取る。
+# ブラウザでの取得に失敗した（ステータスが取れない・本文が空）場合は、HTTPで取れていた静的HTMLの結果を使う。
+async def fetch_page_info(url: str, pool: BrowserPool = None, http: HttpFetcher = None, timings: dict = None,
+                          extraction=None, max_body_chars: int = DEFAULT_MAX_BODY_CHARS):
+    timings = {} if timings is None else timings
+    fallback = None
+    if http is not None:
+        result = await http.fetch(url, timings)
+        if result is not None and not result.pop("escalate", False):
+            logger.debug("%s: served by HTTP (status %s, body length %d)", url, result["status"], len(result["body"]))
+            result["timings"] = timings
+            return result
+        fallback = result
+
+    # プールが渡されなければ、この呼び出し専用のプールを作る（従来どおり1URL1ブラウザ）
+    if pool is None:
+        async with BrowserPool(size=1) as own_pool:
+            result = await _fetch_with_browser(url, own_pool, timings, extraction, max_body_chars)
+    else:
+        result = await _fetch_with_browser(url, pool, timings, extraction, max_body_chars)
+
+    browser_failed = result["status"] is None or isinstance(result["status"], str)
+    if fallback is not None and (browser_failed or (not result["body"] and fallback["body"])):
+        logger.info("%s: browser fetch did not succeed (status %s), using the static HTML result", url, result["status"])
+        fallback["timings"] = timings
+        return fallback
+    return result
+
+
+async def _fetch_with_browser(url: str, pool: BrowserPool, timings: dict, extraction, max_body_chars: int):
+    result = {"status": None, "title": "No Title", "body": "", "tier": TIER_BROWSER, "timings": timings}
+    logger.debug("%s: fetching with browser", url)
+
+    try:
+        async with pool.page() as page:
+            try:
+                # タイムアウトを少し延長し、waitUntilをdomcontentloadedにしてみる（サイトによる）
+                with timed(timings, "navigate"):
+                    response = await page.goto(url, timeout=20000, wait_until="domcontentloaded")
+            except Exception as e:
+                logger.warning("%s: navigation error: %s", url, e)
+                result["status"] = f"Navigation Error: {type(e).__name__}"
+                return result
+
+            if response is None:
+                logger.warning("%s: no response object received", url)
+                result["status"] = "No Response"
+                return result
+
+            status = response.status
+            result["status"] = status
+            if status == 404:
+                logger.debug("%s: page returned 404", url)
+                return result
+            # 400以上のエラーだが404ではない場合もログに残す
+            if status >= 400:
+                logger.info("%s: page returned status %s, extracting anyway", url, status)
+
+            # loadイベントや固定時間ではなく、本文の描画が落ち着いた時点で次へ進む
+            with timed(timings, "wait"):
+                settled = await wait_for_content_ready(page)
+            if not settled:
+                logger.debug("%s: content did not settle within %.0fs", url, READY_TIMEOUT_MS / 1000)
+
+            with timed(timings, "extract"):
+                try:
+                    title = await page.title()
+                    result["title"] = title.strip() if title and title.strip() else "No Title"
+                except Exception as e_title:
+                    logger.warning("%s: error getting title: %s", url, e_title)
+                    result["title"] = "Error Getting Title"
+
+                # 本文取得（まずレンダリング後のHTMLから記事本文を抽出し、取れなければ innerText を使う）
+                try:
+                    # HTMLを文字列にせずに大きさを見積もる（受信したHTMLのバイト数と、描画後の要素数）
+                    html_bytes, elements = await page.evaluate("""
+                        () => {
+                            const nav = performance.getEntriesByType('navigation')[0];
+                            return [nav ? nav.decodedBodySize : 0, document.getElementsByTagName('*').length];
+                        }
+                    """)
+                    if html_bytes > MAX_HTML_BYTES or elements > MAX_DOM_ELEMENTS:
+                        logger.info("%s: page is too large (%d bytes, %d elements), using innerText only", url, html_bytes, elements)
+                    else:
+                        html_content = await page.content()
+                        result["body"] = (await _extract(extraction, html_content, max_body_chars=max_body_chars))["body"]
+                        del html_content
+                except Exception as e_extract:
+                    logger.debug("%s: content extraction failed (%s), falling back to innerText", url, e_extract)
+
+                if not result["body"]:
+                    try:
+                        # 本文が長いページでも、ブラウザ側で切り詰めてから受け取る
+                        page_body_text, total = await page.evaluate("""
+                            (maxChars) => {
+                                const body = document.body;
+                                if (!body) return ['', 0];
+                                const text = body.innerText || body.textContent || '';
+                                return [maxChars ? text.slice(0, maxChars) : text, text.length];
+                            }
+                        """, max_body_chars or 0)
+                        # 文字数の表示がずれないよう、エスケープで増えた分を全体の長さにも足す
+                        escaped = escape_plain_text(page_body_text)
+                        total += len(escaped) - len(page_body_text)
+                        result["body"] = truncate_body(escaped, max_body_chars, total).strip() if escaped else ""
+                    except Exception as e_evaluate:
+                        logger.warning("%s: error getting body with page.evaluate: %s", url, e_evaluate)
+                        result["body"] = ""
+
+            logger.debug("%s: served by browser (status %s, body length %d)", url, status, len(result["body"]))
+            return result
+
+    except Exception as e_outer:
+        logger.error("%s: scraping failed: %s", url, e_outer)
+        result["status"] = f"Outer Exception: {type(e_outer).__name__}"
+        return result
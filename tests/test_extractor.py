@@ -0,0 +1,94 @@
+import pytest
+
+from extractor import (
+    MIN_MAX_BODY_CHARS, TRUNCATION_MARKER, escape_plain_text, extract_title_and_body, truncate_body,
+)
+from notion_blocks import text_to_blocks
+
+
+def _article(paragraphs: int) -> str:
+    return "\n".join(f"段落{i}。" + "本文のテキスト。" * 20 for i in range(paragraphs))
+
+
+def test_short_body_is_returned_unchanged():
+    text = _article(3)
+    assert truncate_body(text, 10_000) == text
+
+
+def test_zero_means_unlimited():
+    text = _article(500)
+    assert truncate_body(text, 0) == text
+    assert truncate_body(text, None) == text
+
+
+@pytest.mark.parametrize("max_chars", [MIN_MAX_BODY_CHARS, 5_000, 200_000])
+def test_truncated_body_fits_the_limit_including_the_marker(max_chars):
+    text = _article(5_000)
+    result = truncate_body(text, max_chars)
+    assert len(result) <= max_chars
+    kept = result.rsplit("\n\n", 1)[0]
+    assert text.startswith(kept)
+    assert result.endswith(TRUNCATION_MARKER.format(omitted=len(text) - len(kept)))
+
+
+@pytest.mark.parametrize("max_chars", [MIN_MAX_BODY_CHARS, 5_000, 200_000])
+def test_truncating_again_returns_the_same_text(max_chars):
+    once = truncate_body(_article(5_000), max_chars)
+    assert truncate_body(once, max_chars) == once
+
+
+def test_cuts_at_a_line_break():
+    text = _article(100)
+    kept = truncate_body(text, 5_000).rsplit("\n\n", 1)[0]
+    assert text[len(kept)] == "\n"
+
+
+@pytest.mark.parametrize("max_chars", [1, 10, 50])
+def test_limits_below_the_minimum_are_clamped(max_chars):
+    text = _article(100)
+    result = truncate_body(text, max_chars)
+    assert result == truncate_body(text, MIN_MAX_BODY_CHARS)
+    assert not result.startswith("\n")
+
+
+def test_total_reports_text_cut_before_the_call():
+    text = _article(100)[:5_000]
+    result = truncate_body(text, 5_000, total=1_000_000)
+    kept = result.rsplit("\n\n", 1)[0]
+    assert result.endswith(TRUNCATION_MARKER.format(omitted=1_000_000 - len(kept)))
+
+
+def test_unclosed_code_fence_is_closed():
+    text = "前置き\n```\n" + "\n".join(f"print({i})" for i in range(2_000)) + "\n```"
+    result = truncate_body(text, 2_000)
+    assert len(result) <= 2_000
+    types = [block["type"] for block in text_to_blocks(result)]
+    assert types[-1] == "paragraph"  # 省略の一文がコードブロックに入らない
+
+
+def test_note_is_appended_even_when_the_body_is_short():
+    result = truncate_body("短い本文", 10_000, note="（途中まで）")
+    assert result == "短い本文\n\n（途中まで）"
+
+
+def test_note_replaces_the_marker_and_keeps_the_limit():
+    text = _article(5_000)
+    result = truncate_body(text, 5_000, note="（ページが大きいため、先頭の 5MB の範囲だけを取り込みました）")
+    assert len(result) <= 5_000
+    assert result.endswith("（ページが大きいため、先頭の 5MB の範囲だけを取り込みました）")
+    assert "省略しました" not in result
+    assert truncate_body(result, 5_000) == result
+
+
+def test_plain_text_fallback_is_not_read_as_markup():
+    text = "```\n# 見出しではない\n- 箇条書きではない\n\\バックスラッシュ\n1. 番号\n> 引用\n本文"
+    blocks = list(text_to_blocks(escape_plain_text(text)))
+    assert [block["type"] for block in blocks] == ["paragraph"]
+    rich_text = blocks[0]["paragraph"]["rich_text"]
+    assert "".join(part["text"]["content"] for part in rich_text) == text
+
+
+def test_short_page_body_falls_back_to_escaped_text():
+    html = "<html><body><p>```</p><p>- 項目</p><p>続き</p></body></html>"
+    body = extract_title_and_body(html)["body"]
+    assert [block["type"] for block in text_to_blocks(body)] == ["paragraph"]
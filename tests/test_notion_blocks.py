@@ -0,0 +1,56 @@
+import pytest
+
+from notion_blocks import MAX_RICH_TEXT_LEN, iter_text_chunks, utf16_len
+
+
+TEXTS = {
+    "ascii": "The quick brown fox jumps over the lazy dog. " * 500,
+    "japanese": "吾輩は猫である。名前はまだ無い。" * 800,
+    "emoji": "😀🎉👍🏽" * 3000,
+    "astral": "𠮷野家の𩸽。" * 2000,
+    "mixed": "\n\n".join(f"段落{i} 😀 emoji𠮷 and text." * 40 for i in range(30)),
+}
+
+
+def test_utf16_len_counts_astral_characters_as_two_units():
+    assert utf16_len("abc") == 3
+    assert utf16_len("日本語") == 3
+    assert utf16_len("😀𠮷") == 4
+
+
+@pytest.mark.parametrize("name", sorted(TEXTS))
+def test_chunks_rejoin_to_the_input(name):
+    text = TEXTS[name]
+    assert "".join(iter_text_chunks(text)) == text
+
+
+@pytest.mark.parametrize("name", sorted(TEXTS))
+def test_chunks_fit_the_limit_in_utf16_units(name):
+    chunks = list(iter_text_chunks(TEXTS[name]))
+    assert len(chunks) > 1
+    assert all(0 < utf16_len(chunk) <= MAX_RICH_TEXT_LEN for chunk in chunks)
+
+
+def test_cuts_at_the_last_paragraph_break():
+    paragraphs = ["あ" * 700, "い" * 700, "う" * 700]
+    chunks = list(iter_text_chunks("\n\n".join(paragraphs)))
+    assert chunks[0] == paragraphs[0] + "\n\n" + paragraphs[1] + "\n\n"
+    assert chunks[1] == paragraphs[2]
+
+
+def test_cuts_after_a_sentence_when_there_is_no_line_break():
+    text = "文です。" * 600  # 2400文字、改行なし
+    chunks = list(iter_text_chunks(text))
+    assert all(chunk.endswith("。") for chunk in chunks)
+
+
+def test_cuts_after_a_sentence_with_emoji():
+    text = "😀 Emoji sentence. " * 200
+    chunks = list(iter_text_chunks(text))
+    assert all(utf16_len(chunk) <= MAX_RICH_TEXT_LEN for chunk in chunks)
+    assert all(chunk.endswith(". ") for chunk in chunks)
+
+
+def test_cuts_at_the_limit_when_there_is_no_boundary():
+    text = "あ" * 4500
+    assert [len(chunk) for chunk in iter_text_chunks(text)] == [2000, 2000, 500]
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+from notion_writer import NotionWriter, PartialPageError, _retry_after
+
+
+def _http_error(status: int, retry_after: str = None) -> HTTPResponseError:
+    headers = {"retry-after": retry_after} if retry_after else {}
+    request = httpx.Request("POST", "https://api.notion.com/v1/pages")
+    return HTTPResponseError(httpx.Response(status, headers=headers, request=request))
+
+
+# ----- 同期クライアントの代わり：エンドポイントごとに、呼ばれた順に例外を送出するか結果を返す -----
+class _Endpoint:
+    def __init__(self, outcomes, default):
+        self.outcomes = list(outcomes)
+        self.default = default
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            outcome = self.outcomes.pop(0) if self.outcomes else self.default
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class _StubNotion:
+    def __init__(self, create=(), append=(), update=()):
+        self.pages = type("Pages", (), {})()
+        self.pages.create = _Endpoint(create, {"id": "page-1"})
+        self.pages.update = _Endpoint(update, {"id": "page-1", "archived": True})
+        self.blocks = type("Blocks", (), {})()
+        self.blocks.children = type("Children", (), {})()
+        self.blocks.children.append = _Endpoint(append, {"results": []})
+
+
+def _writer(notion, rate: float = 100.0) -> NotionWriter:
+    return NotionWriter(notion, "db", rate=rate, base_delay=0.001, max_delay=0.01)
+
+
+def _paragraphs(count: int) -> list:
+    return [{"type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": "本文"}}]}}] * count
+
+
+@pytest.mark.parametrize("error, idempotent, retried", [
+    (RequestTimeoutError(), True, True),
+    (RequestTimeoutError(), False, False),
+    (_http_error(500), True, True),
+    (_http_error(502), False, False),
+    (_http_error(504), False, False),
+    (_http_error(500), False, False),
+    (_http_error(409), False, True),
+    (_http_error(429), False, True),
+    (_http_error(503), False, True),
+    (_http_error(400), True, False),
+    (ValueError("bug"), True, False),
+])
+def test_retry_after_policy(error, idempotent, retried):
+    assert (_retry_after(error, idempotent) is not None) == retried
+
+
+def test_retry_after_header_is_used():
+    assert _retry_after(_http_error(429, "7"), idempotent=False) == 7.0
+    assert _retry_after(_http_error(429, "soon"), idempotent=False) == 0.0
+
+
+@pytest.mark.parametrize("error", [RequestTimeoutError(), _http_error(500), _http_error(502), _http_error(504)])
+def test_page_creation_is_not_retried_after_ambiguous_failures(error):
+    notion = _StubNotion(create=[error])
+    with pytest.raises(type(error)):
+        asyncio.run(_writer(notion).create_page({}, _paragraphs(3)))
+    assert notion.pages.create.calls == 1
+
+
+@pytest.mark.parametrize("status", [409, 429, 503])
+def test_page_creation_is_retried_when_rejected(status):
+    notion = _StubNotion(create=[_http_error(status)])
+    writer = _writer(notion)
+    report = asyncio.run(writer.create_page({}, _paragraphs(3)))
+    assert report["page"]["id"] == "page-1"
+    assert notion.pages.create.calls == 2
+    assert writer.retry_count == 1
+
+
+def test_idempotent_requests_are_retried_after_timeouts_and_5xx():
+    notion = _StubNotion(update=[RequestTimeoutError(), _http_error(502)])
+    asyncio.run(_writer(notion).archive_page("page-1"))
+    assert notion.pages.update.calls == 3
+
+
+def test_append_failure_keeps_the_page_id_and_is_not_retried():
+    notion = _StubNotion(append=[_http_error(504)])
+    with pytest.raises(PartialPageError) as info:
+        asyncio.run(_writer(notion).create_page({}, _paragraphs(250)))
+    assert info.value.page_id == "page-1"
+    assert info.value.blocks_sent == 100
+    assert notion.blocks.children.append.calls == 1
+
+
+def test_rate_is_halved_once_per_429_burst():
+    notion = _StubNotion(create=[_http_error(429, "0.3")] * 6)
+    writer = _writer(notion, rate=8.0)
+
+    async def burst():
+        await asyncio.gather(*(writer.create_page({}, []) for _ in range(6)))
+
+    asyncio.run(burst())
+    assert writer.rate_limited_count == 6
+    assert notion.pages.create.calls == 12
+    # 8 → 4 に1回だけ下がり、その後の成功6回で 0.1 ずつ戻る（2回下がっていれば 2.6 になる）
+    assert writer.current_rate == pytest.approx(4.6)
@@ -0,0 +1,26 @@
+import pytest
+
+from urls import normalize_url
+
+
+@pytest.mark.parametrize("a, b", [
+    ("http://www.Example.com/post/", "https://example.com/post"),
+    ("https://example.com:443/post?utm_source=x&b=2&a=1", "https://example.com/post?a=1&b=2"),
+    ("https://example.com/post#comments", "https://example.com/post"),
+])
+def test_same_article_gets_the_same_key(a, b):
+    assert normalize_url(a) == normalize_url(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("https://twitter.com/#!/jack/status/20", "https://twitter.com/#!/foo/status/99"),
+    ("https://example.com/app#/post/1", "https://example.com/app#/post/2"),
+])
+def test_hash_routes_are_kept_in_the_key(a, b):
+    assert normalize_url(a) != normalize_url(b)
+    assert normalize_url(a) == normalize_url(a.replace("https://", "http://www."))
+
+
+def test_invalid_values_are_empty():
+    assert normalize_url(None) == ""
+    assert normalize_url("  ") == ""
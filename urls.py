@@ -0,0 +1,44 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 記事の内容に関係しないトラッキング用クエリパラメータ
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "source", "cmpid", "_hsenc", "_hsmi", "mkt_tok",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "__twitter", "itm_")
+
+# このように始まるフラグメントはページ内の位置ではなく、記事そのものを指す
+ROUTE_FRAGMENT_PREFIXES = ("!", "/")
+
+
+# ----- 同じ記事を指すURLを1つのキーにまとめる -----
+# http/https の違い、ホスト名の大文字小文字と www.、デフォルトポート、フラグメント、
+# トラッキング用パラメータ、クエリの順序、末尾のスラッシュを無視する。
+# ただし "#!/..." や "#/..." のようにページの中身を指すフラグメント（ハッシュルーティング）は残す。
+def normalize_url(url) -> str:
+    if not isinstance(url, str) or not url.strip():
+        return ""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        port = parts.port
+    except ValueError:
+        return url
+    if not host:
+        return url
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host if port in (None, 80, 443) else f"{host}:{port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+    fragment = parts.fragment if parts.fragment.startswith(ROUTE_FRAGMENT_PREFIXES) else ""
+    return urlunsplit(("https", netloc, path, urlencode(query), fragment))